@@ -0,0 +1,94 @@
+"""Benchmark the http AI backend against the stub model service.
+
+Starts the stub server in a background thread and sends --requests replies
+through HTTPChatBackend, --concurrency at a time. Reports replies per
+second and the median and 99th percentile latency for the pooled backend,
+and for a client opened per reply as the code was structured before.
+
+    python benchmarks/bench_ai_backend.py --requests 500 --concurrency 50
+"""
+
+import argparse
+import asyncio
+import statistics
+import threading
+import time
+
+import httpx
+import uvicorn
+
+from after_us.services.ai_backend import HTTPChatBackend, build_prompt
+from stub_llm_server import create_app
+
+MESSAGE = "I still miss them every day, is that normal?"
+
+
+async def reply_unpooled(base_url: str) -> str:
+    """One reply on a client of its own, as without a shared backend."""
+    async with httpx.AsyncClient(base_url=base_url) as client:
+        response = await client.post(
+            "/chat/completions",
+            json={"model": "stub", "messages": build_prompt(MESSAGE)},
+        )
+        return response.json()["choices"][0]["message"]["content"]
+
+
+async def measure(name: str, reply, count: int, concurrency: int) -> None:
+    slots = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    async def one() -> None:
+        async with slots:
+            started = time.perf_counter()
+            await reply()
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(count)))
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+    print(
+        f"{name:>9}: {count / elapsed:,.0f} replies/s, "
+        f"median {statistics.median(latencies) * 1000:.1f}ms, p99 {p99 * 1000:.1f}ms"
+    )
+
+
+async def run(count: int, concurrency: int, base_url: str) -> None:
+    backend = HTTPChatBackend(
+        base_url=base_url, model="stub", max_concurrency=concurrency
+    )
+    try:
+        await measure(
+            "pooled", lambda: backend.generate(MESSAGE), count, concurrency
+        )
+    finally:
+        await backend.aclose()
+
+    await measure("unpooled", lambda: reply_unpooled(base_url), count, concurrency)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+
+    server = uvicorn.Server(
+        uvicorn.Config(
+            create_app(args.latency), port=args.port, log_level="warning"
+        )
+    )
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+
+    try:
+        asyncio.run(
+            run(args.requests, args.concurrency, f"http://127.0.0.1:{args.port}/v1")
+        )
+    finally:
+        server.should_exit = True
@@ -0,0 +1,108 @@
+"""Benchmark ParsedMessage ingestion strategies.
+
+Compares the ORM unit of work, executemany and COPY FROM STDIN and reports
+rows per second for each. Runs against DATABASE_URL unless --url is given.
+
+    python benchmarks/bench_bulk_insert.py --rows 100000
+"""
+
+import argparse
+import json
+import time
+from datetime import datetime, timedelta
+
+from sqlmodel import Session, SQLModel, create_engine, delete
+
+from after_us.config import DATABASE_URL
+from after_us.models import ChatSession, ParsedMessage, User
+from after_us.services.bulk_insert import (
+    classify_messages,
+    copy_messages,
+    insert_messages,
+    set_fingerprints,
+    supports_copy,
+)
+
+
+def make_rows(session_id: int, count: int) -> list:
+    start = datetime(2020, 1, 1)
+    rows = [
+        {
+            "session_id": session_id,
+            "timestamp": start + timedelta(minutes=i),
+            "sender": "Alice" if i % 2 else "Bob",
+            "content": f"benchmark message number {i} with some text",
+            "is_user": bool(i % 2),
+        }
+        for i in range(count)
+    ]
+    set_fingerprints(rows)
+    classify_messages(rows)
+    return rows
+
+
+def insert_orm(session: Session, rows: list) -> int:
+    for row in rows:
+        session.add(ParsedMessage(**row))
+    return len(rows)
+
+
+def run(url: str, count: int, batch_size: int) -> None:
+    engine = create_engine(url)
+    SQLModel.metadata.create_all(engine)
+
+    strategies = {
+        "orm": insert_orm,
+        "executemany": insert_messages,
+    }
+
+    with Session(engine) as session:
+        if supports_copy(session):
+            strategies["copy"] = copy_messages
+
+        user = User(
+            email=f"bench-{time.time()}@example.com", name="Bench", hashed_password="-"
+        )
+        session.add(user)
+        session.commit()
+        session.refresh(user)
+
+        for name, strategy in strategies.items():
+            chat_session = ChatSession(
+                user_id=user.id, filename="bench.txt", participants=json.dumps([])
+            )
+            session.add(chat_session)
+            session.commit()
+            session.refresh(chat_session)
+
+            rows = make_rows(chat_session.id, count)
+            started = time.perf_counter()
+            for offset in range(0, count, batch_size):
+                strategy(session, rows[offset : offset + batch_size])
+                session.commit()
+            elapsed = time.perf_counter() - started
+
+            print(
+                f"{name:>12}: {count} rows in {elapsed:.2f}s ({count / elapsed:,.0f} rows/s)"
+            )
+
+            session.exec(
+                delete(ParsedMessage).where(ParsedMessage.session_id == chat_session.id)
+            )
+            session.exec(delete(ChatSession).where(ChatSession.id == chat_session.id))
+            session.commit()
+
+        session.delete(user)
+        session.commit()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--url", default=str(DATABASE_URL).replace("postgresql", "postgresql+psycopg")
+    )
+    parser.add_argument("--rows", type=int, default=50_000)
+    parser.add_argument("--batch-size", type=int, default=5_000)
+    args = parser.parse_args()
+
+    run(args.url, args.rows, args.batch_size)
@@ -0,0 +1,118 @@
+"""Benchmark context retrieval for AI replies.
+
+Builds the BM25 index of a synthetic chat session and compares its queries
+with a naive scan that scores every message of the session at query time,
+as fetching relevant context without an index would. Reports the build
+time and the best of --repeat runs per query for both, and whether they
+picked the same messages.
+
+    python benchmarks/bench_context_index.py --messages 200000
+"""
+
+import argparse
+import heapq
+import math
+import random
+import time
+from collections import Counter
+
+from after_us.services.context_index import (
+    BM25_B,
+    BM25_K1,
+    SessionIndex,
+    is_common_term,
+    tokenize,
+)
+
+FILLER = (
+    "the a we you i it was so and but to of in at on for with that this "
+    "dinner tonight just okay what when where there here see call later home "
+    "now ok yes no haha lol sure maybe"
+).split()
+TOPICS = (
+    "paris trip beach birthday anniversary mom dad job interview apartment "
+    "dog vet concert tickets wedding cousin argument sorry movie pizza "
+    "train airport flight hotel museum rain snow gym doctor exam"
+).split()
+QUERIES = [
+    "I keep thinking about our trip to paris",
+    "do you remember the concert tickets",
+    "why did we have that argument about the apartment",
+    "I miss the dog so much",
+    "what happened at the wedding",
+]
+
+
+def make_messages(count: int) -> list:
+    rng = random.Random(0)
+    return [
+        (
+            number + 1,
+            " ".join(
+                rng.choice(TOPICS) if rng.random() < 0.1 else rng.choice(FILLER)
+                for _ in range(rng.randint(3, 20))
+            ),
+        )
+        for number in range(count)
+    ]
+
+
+def naive_search(messages: list, query: str, limit: int) -> list:
+    """Score every message of the session against query with BM25."""
+    documents = [Counter(tokenize(content)) for _, content in messages]
+    count = len(documents)
+    average_length = max(sum(sum(d.values()) for d in documents) / count, 1.0)
+    frequencies = Counter(term for document in documents for term in document)
+
+    scores = {}
+    for term in set(tokenize(query)):
+        frequency = frequencies.get(term, 0)
+        if not frequency or is_common_term(frequency, count):
+            continue
+        idf = math.log(1 + (count - frequency + 0.5) / (frequency + 0.5))
+        for number, document in enumerate(documents):
+            term_count = document.get(term)
+            if term_count:
+                length = sum(document.values())
+                scores[number] = scores.get(number, 0.0) + idf * term_count * (
+                    BM25_K1 + 1
+                ) / (term_count + BM25_K1 * (1 - BM25_B + BM25_B * length / average_length))
+    return heapq.nlargest(limit, scores, key=scores.__getitem__)
+
+
+def best_of(repeat: int, function, *args) -> tuple:
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = function(*args)
+        best = min(best, time.perf_counter() - started)
+    return best, result
+
+
+def run(count: int, repeat: int, limit: int) -> None:
+    messages = make_messages(count)
+    build_time, index = best_of(1, SessionIndex, messages)
+    postings = sum(len(numbers) for numbers, _ in index.postings.values())
+    print(
+        f"{count} messages: index built in {build_time:.2f}s, "
+        f"{len(index.postings)} terms, {postings} postings"
+    )
+
+    for query in QUERIES:
+        indexed_time, indexed = best_of(repeat, index.search, query, limit)
+        naive_time, naive = best_of(1, naive_search, messages, query, limit)
+        same = sorted(indexed) == sorted(naive)
+        print(
+            f"  {query[:40]:<40} index {indexed_time * 1000:7.2f}ms, "
+            f"scan {naive_time * 1000:8.1f}ms, same top {limit}: {same}"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--messages", type=int, default=100_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--top-k", type=int, default=5)
+    args = parser.parse_args()
+
+    run(args.messages, args.repeat, args.top_k)
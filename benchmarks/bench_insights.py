@@ -0,0 +1,191 @@
+"""Benchmark computing /ai/insights for chats of growing size.
+
+Seeds a chat session per size through the ingest path (bulk insert and the
+daily stats), then compares the original endpoint, which loaded every
+message and scanned its text with substring lists, with the current one,
+which sums the session's daily stats and reads its theme bitmasks in SQL.
+The one-off cost of counting the stats is reported separately, since it is
+paid during upload instead of on every request. Runs against DATABASE_URL
+unless --url is given.
+
+    python benchmarks/bench_insights.py --messages 10000 100000 1000000
+"""
+
+import argparse
+import json
+import random
+import time
+from datetime import datetime, timedelta
+
+from sqlmodel import Session, SQLModel, create_engine, delete, select
+
+from after_us.config import DATABASE_URL
+from after_us.models import ChatSession, ParsedMessage, User
+from after_us.services.bulk_insert import bulk_insert_messages
+from after_us.services.chat_stats import refresh_session_stats
+from after_us.services.insights import (
+    InsightCounts,
+    build_chat_insights,
+    find_session_themes,
+    session_insight_counts,
+)
+
+WORDS = (
+    "i love you so much happy today sad about it we should talk later "
+    "what a terrible awful day amazing dinner miss you see you soon "
+    "my parents asked about our plans for the future after work"
+).split()
+
+
+def make_rows(session_id: int, count: int) -> list:
+    rng = random.Random(42)
+    start = datetime(2020, 1, 1)
+    return [
+        {
+            "session_id": session_id,
+            "timestamp": start + timedelta(seconds=97 * i),
+            "sender": "Alice" if i % 3 else "Bob",
+            "content": " ".join(rng.choices(WORDS, k=rng.randint(3, 20))),
+            "is_user": bool(i % 3),
+        }
+        for i in range(count)
+    ]
+
+
+def legacy_insights(session: Session, session_id: int):
+    """The computation as get_chat_insights did it before the stats existed."""
+    messages = session.exec(
+        select(ParsedMessage).where(ParsedMessage.session_id == session_id)
+    ).all()
+
+    user_messages = [msg for msg in messages if msg.is_user]
+    first_message = min(messages, key=lambda m: m.timestamp)
+    last_message = max(messages, key=lambda m: m.timestamp)
+
+    positive_words = ["love", "happy", "great", "amazing", "wonderful", "perfect"]
+    negative_words = ["sad", "angry", "hate", "terrible", "awful", "horrible"]
+
+    positive_score = 0
+    negative_score = 0
+    for message in messages:
+        content_lower = message.content.lower()
+        has_positive = any(word in content_lower for word in positive_words)
+        has_negative = any(word in content_lower for word in negative_words)
+
+        if has_positive and not has_negative:
+            positive_score += 1
+        elif has_negative and not has_positive:
+            negative_score += 1
+
+    all_text = " ".join([msg.content for msg in messages]).lower()
+    theme_keywords = {
+        "love": ["love", "romantic", "relationship", "together"],
+        "conflict": ["fight", "argue", "angry", "disagree"],
+        "future": ["future", "plans", "tomorrow", "next"],
+        "family": ["family", "parents", "mom", "dad"],
+        "work": ["work", "job", "career", "office"],
+    }
+    key_themes = [
+        theme
+        for theme, keywords in theme_keywords.items()
+        if any(keyword in all_text for keyword in keywords)
+    ]
+
+    counts = InsightCounts(
+        total_messages=len(messages),
+        user_messages=len(user_messages),
+        positive_messages=positive_score,
+        negative_messages=negative_score,
+        first_message_at=first_message.timestamp,
+        last_message_at=last_message.timestamp,
+    )
+    return build_chat_insights(session_id, counts, key_themes)
+
+
+def current_insights(session: Session, session_id: int):
+    """The computation as get_chat_insights does it now, without the cache."""
+    counts = session_insight_counts(session, session_id)
+    key_themes = find_session_themes(session, session_id)
+    return build_chat_insights(session_id, counts, key_themes)
+
+
+def measure(function, *args, repeat: int) -> tuple:
+    elapsed = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = function(*args)
+        elapsed = min(elapsed, time.perf_counter() - started)
+    return elapsed, result
+
+
+def run(url: str, sizes: list, repeat: int, batch_size: int) -> None:
+    engine = create_engine(url)
+    SQLModel.metadata.create_all(engine)
+
+    with Session(engine) as session:
+        user = User(
+            email=f"bench-{time.time()}@example.com", name="Bench", hashed_password="-"
+        )
+        session.add(user)
+        session.commit()
+        session.refresh(user)
+
+        for count in sizes:
+            chat_session = ChatSession(
+                user_id=user.id, filename="bench.txt", participants=json.dumps([])
+            )
+            session.add(chat_session)
+            session.commit()
+            session.refresh(chat_session)
+            session_id = chat_session.id
+
+            rows = make_rows(session_id, count)
+            for offset in range(0, count, batch_size):
+                bulk_insert_messages(session, rows[offset : offset + batch_size])
+            session.commit()
+
+            started = time.perf_counter()
+            refresh_session_stats(session, session_id)
+            session.commit()
+            ingest = time.perf_counter() - started
+
+            legacy, expected = measure(
+                legacy_insights, session, session_id, repeat=repeat
+            )
+            session.expunge_all()
+            current, report = measure(
+                current_insights, session, session_id, repeat=repeat
+            )
+            # The lexicons match whole words where the old lists matched
+            # substrings, so only the totals are expected to agree
+            assert report.communication_patterns["total_messages"] == (
+                expected.communication_patterns["total_messages"]
+            )
+            assert report.relationship_duration == expected.relationship_duration
+
+            print(
+                f"{count:>9} messages: per-message {legacy * 1000:.1f}ms, "
+                f"stats {current * 1000:.2f}ms, speedup {legacy / current:,.0f}x "
+                f"(stats counted at ingest in {ingest * 1000:.0f}ms)"
+            )
+
+            session.exec(delete(ChatSession).where(ChatSession.id == session_id))
+            session.commit()
+
+        session.delete(user)
+        session.commit()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--url", default=str(DATABASE_URL).replace("postgresql", "postgresql+psycopg")
+    )
+    parser.add_argument(
+        "--messages", type=int, nargs="+", default=[10_000, 100_000, 1_000_000]
+    )
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--batch-size", type=int, default=5_000)
+    args = parser.parse_args()
+
+    run(args.url, args.messages, args.repeat, args.batch_size)
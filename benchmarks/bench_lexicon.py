@@ -0,0 +1,121 @@
+"""Benchmark keyword matching of chat messages.
+
+Compares the original per-keyword substring checks with the compiled
+lexicons on synthetic messages, one use at a time: sentiment, themes and
+emotion. Reports the best of --repeat runs in messages per
+second for each, and how many results changed because the lexicons only
+match whole words.
+
+    python benchmarks/bench_lexicon.py --messages 200000
+"""
+
+import argparse
+import random
+import time
+
+from after_us.services.lexicon import EMOTIONS, SENTIMENT, THEMES
+
+POSITIVE_WORDS = ["love", "happy", "great", "amazing", "wonderful", "perfect"]
+NEGATIVE_WORDS = ["sad", "angry", "hate", "terrible", "awful", "horrible"]
+THEME_KEYWORDS = {
+    "love": ["love", "romantic", "relationship", "together"],
+    "conflict": ["fight", "argue", "angry", "disagree"],
+    "future": ["future", "plans", "tomorrow", "next"],
+    "family": ["family", "parents", "mom", "dad"],
+    "work": ["work", "job", "career", "office"],
+}
+EMOTION_KEYWORDS = {
+    "sad": ["sad", "hurt", "pain"],
+    "angry": ["angry", "mad", "furious"],
+    "positive": ["happy", "good", "better"],
+    "confused": ["confused", "lost", "don't know"],
+}
+
+FILLER = (
+    "the a we you i it was so and but to of in at on for with that this "
+    "dinner tonight blast lastly meetings madness gladly loving just okay "
+    "what when where there here see call later home now ok yes no haha"
+).split()
+KEYWORDS = (
+    "office dad mom happy sad love hate tomorrow plans fight sweet birthday "
+    "goodbye lost good better furious first last"
+).split()
+
+
+def legacy_sentiment(content: str) -> tuple:
+    content_lower = content.lower()
+    return (
+        any(word in content_lower for word in POSITIVE_WORDS),
+        any(word in content_lower for word in NEGATIVE_WORDS),
+    )
+
+
+def lexicon_sentiment(content: str) -> tuple:
+    sentiment = SENTIMENT.match(content)
+    return "positive" in sentiment, "negative" in sentiment
+
+
+def legacy_themes(content: str) -> set:
+    content_lower = content.lower()
+    return {
+        theme
+        for theme, keywords in THEME_KEYWORDS.items()
+        if any(keyword in content_lower for keyword in keywords)
+    }
+
+
+def legacy_emotion(content: str):
+    content_lower = content.lower()
+    for emotion, keywords in EMOTION_KEYWORDS.items():
+        if any(word in content_lower for word in keywords):
+            return emotion
+    return None
+
+
+CASES = {
+    "sentiment": (legacy_sentiment, lexicon_sentiment),
+    "themes": (legacy_themes, THEMES.match),
+    "emotion": (legacy_emotion, EMOTIONS.first),
+}
+
+
+def make_messages(count: int, keyword_rate: float) -> list:
+    rng = random.Random(42)
+    return [
+        " ".join(
+            rng.choice(KEYWORDS) if rng.random() < keyword_rate else rng.choice(FILLER)
+            for _ in range(rng.randint(3, 30))
+        )
+        for _ in range(count)
+    ]
+
+
+def measure(classify, messages: list, repeat: int) -> tuple:
+    elapsed = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        results = [classify(content) for content in messages]
+        elapsed = min(elapsed, time.perf_counter() - started)
+    return elapsed, results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--messages", type=int, default=200_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument(
+        "--keyword-rate", type=float, default=0.02, help="share of words that are keywords"
+    )
+    args = parser.parse_args()
+
+    messages = make_messages(args.messages, args.keyword_rate)
+
+    for name, (legacy_classify, lexicon_classify) in CASES.items():
+        legacy, legacy_results = measure(legacy_classify, messages, args.repeat)
+        current, current_results = measure(lexicon_classify, messages, args.repeat)
+        changed = sum(a != b for a, b in zip(legacy_results, current_results))
+        print(
+            f"{name:>9}: legacy {len(messages) / legacy:,.0f} messages/s, "
+            f"lexicon {len(messages) / current:,.0f} messages/s, "
+            f"speedup {legacy / current:.1f}x, {changed} results changed"
+        )
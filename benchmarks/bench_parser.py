@@ -0,0 +1,136 @@
+"""Benchmark the WhatsApp export parser.
+
+Compares the original strptime based parser with the format-sniffing parser
+on a synthetic export and reports the best of --repeat runs in lines per
+second for each. With --workers, also parses the blocks past --threshold
+bytes in a process pool, started cold for every run and then kept warm, to
+compare with parsing inline.
+
+    python benchmarks/bench_parser.py --lines 1000000 --workers 4
+"""
+
+import argparse
+import multiprocessing
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
+from functools import partial
+
+from after_us.config import CHAT_PARSE_PARALLEL_THRESHOLD
+from after_us.services.chat_parser import parse_whatsapp_export
+
+
+def legacy_parse_whatsapp_export(content: str, user_name: str) -> list:
+    """The parser as it was before the format-sniffing engine."""
+    messages = []
+    pattern = r"(\d{1,2}/\d{1,2}/\d{4}, \d{1,2}:\d{2}(?::\d{2})?\s*[APMapm]{2})\s*-\s*([^:]+):\s*(.+)"
+
+    for line in content.split("\n"):
+        line = line.strip()
+        if not line:
+            continue
+
+        match = re.match(pattern, line)
+        if match:
+            timestamp_str, sender, message_content = match.groups()
+            timestamp_str = re.sub(r"\s+", " ", timestamp_str).strip()
+            try:
+                if timestamp_str.count(":") == 2:
+                    timestamp = datetime.strptime(
+                        timestamp_str, "%d/%m/%Y, %I:%M:%S %p"
+                    )
+                else:
+                    timestamp = datetime.strptime(timestamp_str, "%d/%m/%Y, %I:%M %p")
+            except ValueError:
+                continue
+
+            messages.append(
+                {
+                    "timestamp": timestamp,
+                    "sender": sender.strip(),
+                    "content": message_content.strip(),
+                    "is_user": sender.strip() == user_name.strip(),
+                }
+            )
+
+    return messages
+
+
+def parse_in_cold_pool(content: str, user_name: str, workers: int, threshold: int):
+    with ProcessPoolExecutor(
+        max_workers=workers, mp_context=multiprocessing.get_context("spawn")
+    ) as executor:
+        return parse_whatsapp_export(content, user_name, executor, threshold)
+
+
+def make_export(count: int) -> str:
+    start = datetime(2020, 1, 1)
+    lines = []
+    for i in range(count):
+        timestamp = start + timedelta(seconds=37 * i)
+        lines.append(
+            f"{timestamp:%d/%m/%Y}, {timestamp:%I:%M %p} - "
+            f"{'Alice' if i % 3 else 'Bob'}: message number {i} with some text"
+        )
+    return "\n".join(lines)
+
+
+def measure(name: str, parse, content: str, count: int, repeat: int) -> float:
+    elapsed = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        messages = parse(content, "Alice")
+        elapsed = min(elapsed, time.perf_counter() - started)
+    print(
+        f"{name:>8}: {len(messages)} messages in {elapsed:.2f}s "
+        f"({count / elapsed:,.0f} lines/s)"
+    )
+    return elapsed
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--lines", type=int, default=200_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument(
+        "--workers", type=int, default=0, help="also benchmark a process pool"
+    )
+    parser.add_argument("--threshold", type=int, default=CHAT_PARSE_PARALLEL_THRESHOLD)
+    args = parser.parse_args()
+
+    content = make_export(args.lines)
+    assert parse_whatsapp_export(content, "Alice") == [
+        tuple(message.values())
+        for message in legacy_parse_whatsapp_export(content, "Alice")
+    ]
+
+    legacy = measure(
+        "legacy", legacy_parse_whatsapp_export, content, args.lines, args.repeat
+    )
+    current = measure(
+        "sniffing", parse_whatsapp_export, content, args.lines, args.repeat
+    )
+    print(f"speedup: {legacy / current:.1f}x")
+
+    if args.workers:
+        cold = measure(
+            "cold",
+            partial(parse_in_cold_pool, workers=args.workers, threshold=args.threshold),
+            content,
+            args.lines,
+            args.repeat,
+        )
+        print(f"vs inline: {current / cold:.2f}x")
+        with ProcessPoolExecutor(
+            max_workers=args.workers, mp_context=multiprocessing.get_context("spawn")
+        ) as executor:
+            warm = partial(
+                parse_whatsapp_export,
+                executor=executor,
+                parallel_threshold=args.threshold,
+            )
+            # Start the workers before timing
+            warm(make_export(1000), "Alice")
+            warm = measure("warm", warm, content, args.lines, args.repeat)
+        print(f"vs inline: {current / warm:.2f}x")
@@ -0,0 +1,84 @@
+"""Stub model service with an OpenAI-compatible chat completions API.
+
+Answers every request after a fixed delay with a canned reply, and fails a
+share of them with 503, so the http AI backend can be tried and load tested
+without a real model. Streamed replies send one word every --token-delay
+seconds.
+
+    python benchmarks/stub_llm_server.py --port 8080 --latency 0.2
+    AI_BACKEND=http AI_API_URL=http://localhost:8080/v1 uvicorn after_us.main:app
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import re
+import time
+
+from fastapi import FastAPI, HTTPException
+from fastapi.responses import StreamingResponse
+
+REPLY = (
+    "That sounds really hard. It's okay to miss them and still know that "
+    "moving on is the right thing for you."
+)
+
+
+def create_app(
+    latency: float = 0.2, fail_rate: float = 0.0, token_delay: float = 0.02
+) -> FastAPI:
+    app = FastAPI()
+
+    async def stream_reply(model: str):
+        for word in re.findall(r"\S+\s*", REPLY):
+            chunk = {
+                "object": "chat.completion.chunk",
+                "model": model,
+                "choices": [{"index": 0, "delta": {"content": word}}],
+            }
+            yield f"data: {json.dumps(chunk)}\n\n"
+            await asyncio.sleep(token_delay)
+        yield "data: [DONE]\n\n"
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(payload: dict):
+        await asyncio.sleep(latency)
+        if random.random() < fail_rate:
+            raise HTTPException(status_code=503, detail="Overloaded")
+
+        if payload.get("stream"):
+            return StreamingResponse(
+                stream_reply(payload.get("model", "stub")),
+                media_type="text/event-stream",
+            )
+
+        return {
+            "id": f"stub-{time.time_ns()}",
+            "object": "chat.completion",
+            "model": payload.get("model", "stub"),
+            "choices": [
+                {
+                    "index": 0,
+                    "message": {"role": "assistant", "content": REPLY},
+                    "finish_reason": "stop",
+                }
+            ],
+        }
+
+    return app
+
+
+if __name__ == "__main__":
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--latency", type=float, default=0.2)
+    parser.add_argument("--fail-rate", type=float, default=0.0)
+    parser.add_argument("--token-delay", type=float, default=0.02)
+    args = parser.parse_args()
+
+    uvicorn.run(
+        create_app(args.latency, args.fail_rate, args.token_delay), port=args.port
+    )
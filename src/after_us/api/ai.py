@@ -1,6 +1,10 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+import asyncio
+from functools import partial, reduce
+from fastapi import APIRouter, Depends, HTTPException, Request, status
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
 from sqlmodel import Session, select
-from typing import List, Dict, Any
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
 import json
 import uuid
 from ..models.user import User
@@ -12,59 +16,51 @@ from ..schemas.ai import (
     StartHealingSessionRequest,
     HealingSessionResponse,
 )
-from ..schemas.chat import ChatInsightsResponse
+from ..schemas.chat import (
+    ChatInsightsResponse,
+    ChatPatternsResponse,
+    CombinedInsightsRequest,
+    CombinedInsightsResponse,
+)
+from ..services.ai_backend import AIBackend, AIBackendError, RuleBasedBackend
+from ..services.context_index import (
+    build_session_index,
+    context_index_cache,
+    find_context_messages,
+)
+from ..services.insights import (
+    INSIGHTS_VERSION,
+    PATTERNS_VERSION,
+    InsightPartial,
+    build_chat_insights,
+    build_combined_insights,
+    compute_chat_patterns,
+    compute_session_partial,
+    find_session_themes,
+    session_insight_counts,
+)
+from ..services.insights_cache import insights_cache
+from ..services.lexicon import EMOTIONS
 from ..utils.auth import get_current_user
 from ..utils.database import get_session
 
 router = APIRouter(prefix="/ai", tags=["AI"])
 
+SSE_MEDIA_TYPE = "text/event-stream"
 
-def generate_ai_response(
-    message: str,
-    personality: AIPersonality = None,
-    context_messages: List[ParsedMessage] = None,
-) -> str:
-    """Generate AI response based on user input and context."""
-    # This is a simplified AI response generator
-    # In a real implementation, this would integrate with an AI service like OpenAI GPT
+# Used when the app was started without its lifespan, e.g. in tests
+default_backend = RuleBasedBackend()
 
-    base_response = "I understand how you're feeling. "
 
-    if personality:
-        if personality.tone == "supportive":
-            base_response += "Remember that healing takes time, and you're doing great by taking this step. "
-        elif personality.tone == "empathetic":
-            base_response += (
-                "I can feel the emotion in your words, and that's completely valid. "
-            )
-        elif personality.tone == "challenging":
-            base_response += "Let's think about this differently - what would your stronger self do? "
-
-    # Simple keyword-based responses
-    message_lower = message.lower()
-    if any(word in message_lower for word in ["sad", "hurt", "pain"]):
-        base_response += "It's natural to feel this way after a relationship ends. These feelings are part of the healing process."
-    elif any(word in message_lower for word in ["angry", "mad", "furious"]):
-        base_response += "Anger is often a secondary emotion that masks hurt. It's okay to feel angry, but let's explore what's underneath."
-    elif any(word in message_lower for word in ["miss", "lonely", "alone"]):
-        base_response += "Missing someone shows how much they meant to you. This feeling will soften with time."
-    elif any(word in message_lower for word in ["future", "move on", "forward"]):
-        base_response += "Looking forward is a positive sign. You're already on the path to healing and growth."
-    else:
-        base_response += (
-            "Thank you for sharing that with me. Your feelings are valid and important."
-        )
-
-    return base_response
+def get_ai_backend(request: Request) -> AIBackend:
+    """Get the backend writing AI replies, rule-based outside the app."""
+    return getattr(request.app.state, "ai_backend", None) or default_backend
 
 
-@router.post("/chat", response_model=AIChatResponse)
-async def ai_chat(
-    chat_request: AIChatRequest,
-    current_user: User = Depends(get_current_user),
-    session: Session = Depends(get_session),
-):
-    """AI chat conversation with user."""
+async def _get_chat_context(
+    session: Session, current_user: User, chat_request: AIChatRequest
+) -> Tuple[Optional[AIPersonality], Optional[List[ParsedMessage]]]:
+    """Get the personality and chat history an AI reply is written with."""
     # Get user's AI personality settings
     personality = session.exec(
         select(AIPersonality).where(AIPersonality.user_id == current_user.id)
@@ -73,28 +69,38 @@ async def ai_chat(
     context_messages = None
     if chat_request.context_session_id:
         # Get context from specific chat session
-        context_messages = session.exec(
-            select(ParsedMessage)
-            .where(ParsedMessage.session_id == chat_request.context_session_id)
-            .limit(10)  # Last 10 messages for context
-        ).all()
+        chat_session = session.exec(
+            select(ChatSession).where(
+                ChatSession.id == chat_request.context_session_id,
+                ChatSession.user_id == current_user.id,
+                ChatSession.deleting.is_(False),
+            )
+        ).first()
+
+        if not chat_session:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND, detail="Chat session not found"
+            )
+
+        # Messages most relevant to the user's message, from an index built
+        # once per session
+        index = await context_index_cache.get_or_build(
+            chat_session,
+            partial(run_in_threadpool, build_session_index, chat_session.id),
+        )
+        context_messages = find_context_messages(
+            session, chat_session.id, index, chat_request.message
+        )
+
+    return personality, context_messages
 
-    # Generate AI response
-    ai_response = generate_ai_response(
-        chat_request.message, personality, context_messages
-    )
 
+def _get_chat_details(
+    chat_request: AIChatRequest, context_messages: Optional[List[ParsedMessage]]
+) -> Dict[str, Any]:
+    """Get the emotion, suggested actions and context used of an AI reply."""
     # Analyze emotion (simplified)
-    emotion = None
-    message_lower = chat_request.message.lower()
-    if any(word in message_lower for word in ["sad", "hurt", "pain"]):
-        emotion = "sad"
-    elif any(word in message_lower for word in ["angry", "mad", "furious"]):
-        emotion = "angry"
-    elif any(word in message_lower for word in ["happy", "good", "better"]):
-        emotion = "positive"
-    elif any(word in message_lower for word in ["confused", "lost", "don't know"]):
-        emotion = "confused"
+    emotion = EMOTIONS.first(chat_request.message)
 
     # Suggest actions based on emotion
     suggested_actions = []
@@ -124,12 +130,174 @@ async def ai_chat(
             "messages_analyzed": len(context_messages),
         }
 
+    return {
+        "emotion": emotion,
+        "suggested_actions": suggested_actions,
+        "context_used": context_used,
+    }
+
+
+@router.post("/chat", response_model=AIChatResponse)
+async def ai_chat(
+    chat_request: AIChatRequest,
+    current_user: User = Depends(get_current_user),
+    session: Session = Depends(get_session),
+    ai_backend: AIBackend = Depends(get_ai_backend),
+):
+    """AI chat conversation with user."""
+    personality, context_messages = await _get_chat_context(
+        session, current_user, chat_request
+    )
+
+    # Generate AI response
+    try:
+        ai_response = await ai_backend.generate(
+            chat_request.message, personality, context_messages
+        )
+    except AIBackendError as e:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail=str(e)
+        )
+
     return AIChatResponse(
-        response=ai_response,
-        emotion=emotion,
-        suggested_actions=suggested_actions,
-        context_used=context_used,
+        response=ai_response, **_get_chat_details(chat_request, context_messages)
+    )
+
+
+@router.post("/chat/stream")
+async def ai_chat_stream(
+    chat_request: AIChatRequest,
+    request: Request,
+    current_user: User = Depends(get_current_user),
+    session: Session = Depends(get_session),
+    ai_backend: AIBackend = Depends(get_ai_backend),
+):
+    """AI chat conversation with user, streamed as server-sent events.
+
+    Sends a token event for every piece of the reply as it is generated,
+    then a done event with the emotion, suggested actions and context used,
+    or an error event if the AI service fails on the way. A client that
+    disconnects stops the generation.
+    """
+    personality, context_messages = await _get_chat_context(
+        session, current_user, chat_request
+    )
+    details = _get_chat_details(chat_request, context_messages)
+    tokens = ai_backend.stream(chat_request.message, personality, context_messages)
+
+    async def events() -> AsyncIterator[str]:
+        try:
+            async for token in _until_disconnected(request, tokens):
+                yield _sse_event("token", {"token": token})
+        except AIBackendError as e:
+            yield _sse_event("error", {"detail": str(e)})
+            return
+        yield _sse_event("done", details)
+
+    return StreamingResponse(
+        events(),
+        media_type=SSE_MEDIA_TYPE,
+        # Keep proxies from buffering the events
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+def _sse_event(event: str, data: Any) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+async def _until_disconnected(
+    request: Request, tokens: AsyncIterator[str]
+) -> AsyncIterator[str]:
+    """Yield from tokens until they run out or the client disconnects.
+
+    The next token and the disconnect are awaited together, so an abandoned
+    reply is closed, freeing its backend slot, as soon as the client leaves
+    rather than when the next token fails to send.
+    """
+    disconnected = asyncio.ensure_future(_wait_for_disconnect(request))
+    next_token = None
+    try:
+        while True:
+            next_token = asyncio.ensure_future(anext(tokens))
+            await asyncio.wait(
+                {next_token, disconnected}, return_when=asyncio.FIRST_COMPLETED
+            )
+            if not next_token.done():
+                return
+            try:
+                token = next_token.result()
+            except StopAsyncIteration:
+                return
+            yield token
+    finally:
+        disconnected.cancel()
+        if next_token is not None and not next_token.done():
+            next_token.cancel()
+            await asyncio.gather(next_token, return_exceptions=True)
+        await tokens.aclose()
+
+
+async def _wait_for_disconnect(request: Request) -> None:
+    # The body was already read, so the next message is the disconnect
+    while (await request.receive())["type"] != "http.disconnect":
+        pass
+
+
+@router.post("/insights/combined", response_model=CombinedInsightsResponse)
+async def get_combined_insights(
+    request: CombinedInsightsRequest,
+    current_user: User = Depends(get_current_user),
+    session: Session = Depends(get_session),
+):
+    """Get one insights report over several chat sessions.
+
+    Each session's totals and themes are computed and cached on their own,
+    in parallel, and then merged, so adding a session to the selection only
+    computes that session.
+    """
+    session_ids = list(dict.fromkeys(request.session_ids))
+    chat_sessions = session.exec(
+        select(ChatSession).where(
+            ChatSession.id.in_(session_ids),
+            ChatSession.user_id == current_user.id,
+            ChatSession.deleting.is_(False),
+        )
+    ).all()
+
+    if len(chat_sessions) != len(session_ids):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="Chat session not found"
+        )
+
+    def compute_partial(chat_session: ChatSession):
+        async def compute() -> InsightPartial:
+            return await run_in_threadpool(compute_session_partial, chat_session.id)
+
+        return compute
+
+    partials = await asyncio.gather(
+        *(
+            insights_cache.get_or_compute(
+                session,
+                chat_session,
+                "partial",
+                INSIGHTS_VERSION,
+                InsightPartial,
+                compute_partial(chat_session),
+            )
+            for chat_session in chat_sessions
+        )
     )
+    combined = reduce(InsightPartial.merge, partials)
+
+    if not combined.counts.total_messages:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="No messages found in sessions",
+        )
+
+    return build_combined_insights(session_ids, combined.counts, combined.key_themes)
 
 
 @router.get("/insights/{session_id}", response_model=ChatInsightsResponse)
@@ -142,7 +310,9 @@ async def get_chat_insights(
     # Verify session belongs to user
     chat_session = session.exec(
         select(ChatSession).where(
-            ChatSession.id == session_id, ChatSession.user_id == current_user.id
+            ChatSession.id == session_id,
+            ChatSession.user_id == current_user.id,
+            ChatSession.deleting.is_(False),
         )
     ).first()
 
@@ -151,115 +321,73 @@ async def get_chat_insights(
             status_code=status.HTTP_404_NOT_FOUND, detail="Chat session not found"
         )
 
-    # Get messages from the session
-    messages = session.exec(
-        select(ParsedMessage).where(ParsedMessage.session_id == session_id)
-    ).all()
+    async def compute_insights() -> ChatInsightsResponse:
+        counts = session_insight_counts(session, session_id)
 
-    if not messages:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="No messages found in session",
-        )
+        if not counts.total_messages:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="No messages found in session",
+            )
 
-    # Analyze messages for insights (simplified analysis)
-    user_messages = [msg for msg in messages if msg.is_user]
-    partner_messages = [msg for msg in messages if not msg.is_user]
-
-    # Calculate relationship duration
-    first_message = min(messages, key=lambda m: m.timestamp)
-    last_message = max(messages, key=lambda m: m.timestamp)
-    duration = last_message.timestamp - first_message.timestamp
-    relationship_duration = f"{duration.days} days"
-
-    # Analyze communication patterns
-    total_messages = len(messages)
-    user_message_count = len(user_messages)
-    partner_message_count = len(partner_messages)
-
-    communication_patterns = {
-        "total_messages": str(total_messages),
-        "user_percentage": f"{(user_message_count / total_messages * 100):.1f}%",
-        "partner_percentage": f"{(partner_message_count / total_messages * 100):.1f}%",
-        "messages_per_day": f"{total_messages / max(duration.days, 1):.1f}",
-    }
+        # Extract key themes (simplified keyword extraction)
+        key_themes = find_session_themes(session, session_id)
 
-    # Simple sentiment analysis
-    positive_words = ["love", "happy", "great", "amazing", "wonderful", "perfect"]
-    negative_words = ["sad", "angry", "hate", "terrible", "awful", "horrible"]
-
-    positive_score = 0
-    negative_score = 0
-    neutral_score = 0
-
-    for message in messages:
-        content_lower = message.content.lower()
-        has_positive = any(word in content_lower for word in positive_words)
-        has_negative = any(word in content_lower for word in negative_words)
-
-        if has_positive and not has_negative:
-            positive_score += 1
-        elif has_negative and not has_positive:
-            negative_score += 1
-        else:
-            neutral_score += 1
-
-    total_analyzed = positive_score + negative_score + neutral_score
-    emotional_tone = {
-        "positive": positive_score / total_analyzed if total_analyzed > 0 else 0,
-        "negative": negative_score / total_analyzed if total_analyzed > 0 else 0,
-        "neutral": neutral_score / total_analyzed if total_analyzed > 0 else 0,
-    }
+        return build_chat_insights(session_id, counts, key_themes)
 
-    # Extract key themes (simplified keyword extraction)
-    all_text = " ".join([msg.content for msg in messages]).lower()
-    theme_keywords = {
-        "love": ["love", "romantic", "relationship", "together"],
-        "conflict": ["fight", "argue", "angry", "disagree"],
-        "future": ["future", "plans", "tomorrow", "next"],
-        "family": ["family", "parents", "mom", "dad"],
-        "work": ["work", "job", "career", "office"],
-    }
+    # Messages don't change once stored, so the report is only computed
+    # again after an append
+    return await insights_cache.get_or_compute(
+        session,
+        chat_session,
+        "insights",
+        INSIGHTS_VERSION,
+        ChatInsightsResponse,
+        compute_insights,
+    )
 
-    key_themes = []
-    for theme, keywords in theme_keywords.items():
-        if any(keyword in all_text for keyword in keywords):
-            key_themes.append(theme)
 
-    # Calculate relationship health score (simplified)
-    health_score = (
-        emotional_tone["positive"] * 100
-        + (1 - abs(0.5 - user_message_count / total_messages)) * 50
-    )
-    health_score = min(100, max(0, health_score))
+@router.get("/insights/{session_id}/patterns", response_model=ChatPatternsResponse)
+async def get_chat_patterns(
+    session_id: int,
+    current_user: User = Depends(get_current_user),
+    session: Session = Depends(get_session),
+):
+    """Get who replied faster and when the conversation was most active.
 
-    # Generate recommendations
-    recommendations = []
-    if emotional_tone["negative"] > 0.4:
-        recommendations.append(
-            "Focus on processing negative emotions through journaling or therapy"
+    Returns the median and 90th percentile reply time of each sender, an
+    hour-of-day by day-of-week heatmap of messages and the messages sent in
+    every month.
+    """
+    chat_session = session.exec(
+        select(ChatSession).where(
+            ChatSession.id == session_id,
+            ChatSession.user_id == current_user.id,
+            ChatSession.deleting.is_(False),
         )
-    if emotional_tone["positive"] > 0.6:
-        recommendations.append(
-            "Cherish the positive memories while allowing yourself to move forward"
+    ).first()
+
+    if not chat_session:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="Chat session not found"
         )
-    if abs(user_message_count - partner_message_count) > total_messages * 0.3:
-        recommendations.append(
-            "Reflect on communication balance in future relationships"
+
+    if not chat_session.total_messages:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="No messages found in session",
         )
 
-    recommendations.append(
-        "Practice self-care and be patient with your healing process"
-    )
+    async def compute_patterns() -> ChatPatternsResponse:
+        return compute_chat_patterns(session, session_id)
 
-    return ChatInsightsResponse(
-        session_id=session_id,
-        relationship_duration=relationship_duration,
-        communication_patterns=communication_patterns,
-        emotional_tone=emotional_tone,
-        key_themes=key_themes,
-        relationship_health_score=round(health_score, 1),
-        recommendations=recommendations,
+    return await insights_cache.get_or_compute(
+        session,
+        chat_session,
+        "patterns",
+        PATTERNS_VERSION,
+        ChatPatternsResponse,
+        compute_patterns,
     )
 
 
@@ -1,137 +1,588 @@
-from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File
+from fastapi import (
+    APIRouter,
+    BackgroundTasks,
+    Depends,
+    HTTPException,
+    status,
+    UploadFile,
+    File,
+    Request,
+    Query,
+)
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from sqlalchemy import tuple_, update
 from sqlmodel import Session, select
-import re
-from typing import List
-import json
-import re
+from concurrent.futures import Executor
 from datetime import datetime
+from typing import BinaryIO, Iterator, List, Optional
+import fcntl
+import json
+from ..config import CHAT_DELETE_BACKGROUND_THRESHOLD
 from ..models.user import User
 from ..models.chat import ChatSession, ParsedMessage
+from ..models.ingestion import ChunkedUpload, IngestionJob, JobStatus
 from ..schemas.chat import (
     ChatSessionResponse,
     ChatSessionDetailResponse,
     ParsedMessageResponse,
-    ChatInsightsResponse,
+    ParsedMessagePageResponse,
+    MessageSearchResult,
+    MessageSearchResponse,
+    IngestionJobResponse,
+    CreateChunkedUploadRequest,
+    ChunkedUploadResponse,
 )
 from ..schemas.common import StatusResponse
+from ..services.chat_archive import is_supported_export
+from ..services.chat_ingest import discard_chat_session
+from ..services.chat_purge import mark_chat_session_deleting, purge_chat_session
+from ..services.chat_search import search_messages
+from ..services.ingestion_jobs import (
+    IngestionWorkerPool,
+    create_spool_file,
+    remove_spool_file,
+    run_ingestion_job,
+    spool_upload,
+)
 from ..utils.auth import get_current_user
-from ..utils.database import get_session
+from ..utils.database import engine, get_session
+from ..utils.pagination import NEXT, PREV, decode_cursor, encode_cursor
 
 router = APIRouter(prefix="/chat", tags=["Chat"])
 
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
 
-def parse_whatsapp_export(content: str, user_name: str) -> List[dict]:
-    messages = []
-    lines = content.split("\n")
+# Messages fetched per round trip when streaming a session
+NDJSON_BATCH_SIZE = 1000
 
-    # WhatsApp format: [DD/MM/YYYY, HH:MM AM/PM] Name: Message
-    pattern = r"(\d{1,2}/\d{1,2}/\d{4}, \d{1,2}:\d{2}(?::\d{2})?\s*[APMapm]{2})\s*-\s*([^:]+):\s*(.+)"
 
-    for line in lines:
-        line = line.strip()
-        if not line:
-            continue
+def get_parse_executor(request: Request) -> Optional[Executor]:
+    """Get the process pool used to parse large exports, if one is running."""
+    return getattr(request.app.state, "parse_executor", None)
 
-        match = re.match(pattern, line)
-        if match:
-            timestamp_str, sender, message_content = match.groups()
 
-            # Normalize unicode whitespace characters
-            timestamp_str = re.sub(r'\s+', ' ', timestamp_str).strip()
+def get_ingestion_pool(request: Request) -> Optional[IngestionWorkerPool]:
+    """Get the background ingestion worker pool, if one is running."""
+    return getattr(request.app.state, "ingestion_pool", None)
 
-            # Parse timestamp
-            try:
-                if timestamp_str.count(":") == 2:
-                    timestamp = datetime.strptime(timestamp_str, "%d/%m/%Y, %I:%M:%S %p")
-                else:
-                    timestamp = datetime.strptime(timestamp_str, "%d/%m/%Y, %I:%M %p")
-            except ValueError:
-                continue  # Skip badly formatted timestamps
 
-            is_user = sender.strip() == user_name.strip()
+@router.post(
+    "/upload",
+    response_model=IngestionJobResponse,
+    status_code=status.HTTP_202_ACCEPTED,
+)
+async def upload_chat(
+    file: UploadFile = File(...),
+    session_id: Optional[int] = None,
+    current_user: User = Depends(get_current_user),
+    session: Session = Depends(get_session),
+    ingestion_pool: Optional[IngestionWorkerPool] = Depends(get_ingestion_pool),
+    executor: Optional[Executor] = Depends(get_parse_executor),
+):
+    """Upload a WhatsApp chat export and queue it for processing.
+
+    Accepts the exported .txt file or the .zip archive WhatsApp produces.
+    Pass session_id to append a newer export of the same conversation to an
+    existing session; only messages after the ones it already holds are
+    stored. Returns an ingestion job right away; poll /chat/jobs/{job_id}
+    for its progress.
+    """
+    if not is_supported_export(file.filename):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Only .txt and .zip files are supported",
+        )
 
-            messages.append(
-                {
-                    "timestamp": timestamp,
-                    "sender": sender.strip(),
-                    "content": message_content.strip(),
-                    "is_user": is_user,
-                }
-            )
+    chat_session = None
+    if session_id is not None:
+        chat_session = _get_append_target(session, session_id, current_user)
+
+    # Keep the upload on local disk so the job can be resumed after a restart
+    spool_path = await run_in_threadpool(spool_upload, file.file)
+
+    job = await _start_ingestion(
+        session,
+        current_user,
+        file.filename,
+        spool_path,
+        chat_session,
+        ingestion_pool,
+        executor,
+    )
+    return _job_response(job)
 
 
-    return messages
-@router.post("/upload", response_model=ChatSessionResponse)
-async def upload_chat(
-    file: UploadFile = File(...),
+@router.post(
+    "/uploads",
+    response_model=ChunkedUploadResponse,
+    status_code=status.HTTP_201_CREATED,
+)
+async def create_chunked_upload(
+    upload_request: CreateChunkedUploadRequest,
     current_user: User = Depends(get_current_user),
     session: Session = Depends(get_session),
 ):
-    """Upload and process WhatsApp chat export file."""
-    if not file.filename.endswith(".txt"):
+    """Start a resumable upload of a WhatsApp chat export.
+
+    Send the file in order with PUT /chat/uploads/{upload_id}?offset=N, where
+    N is the number of bytes already received. After a dropped connection,
+    GET the upload to find the offset to continue from. Finish with POST
+    /chat/uploads/{upload_id}/complete, which queues the ingestion job.
+    """
+    if not is_supported_export(upload_request.filename):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Only .txt files are supported",
+            detail="Only .txt and .zip files are supported",
         )
 
-    try:
-        content = await file.read()
-        text_content = content.decode("utf-8")
+    if upload_request.session_id is not None:
+        _get_append_target(session, upload_request.session_id, current_user)
 
+    upload = ChunkedUpload(
+        user_id=current_user.id,
+        session_id=upload_request.session_id,
+        filename=upload_request.filename,
+        spool_path=await run_in_threadpool(create_spool_file),
+        size=upload_request.size,
+    )
+    session.add(upload)
+    session.commit()
+    session.refresh(upload)
 
-        # Parse messages
-        parsed_messages = parse_whatsapp_export(text_content, current_user.name)
+    return _upload_response(upload)
 
 
-        if not parsed_messages:
+@router.get("/uploads/{upload_id}", response_model=ChunkedUploadResponse)
+async def get_chunked_upload(
+    upload_id: int,
+    current_user: User = Depends(get_current_user),
+    session: Session = Depends(get_session),
+):
+    """Get a resumable upload, including the offset to send next."""
+    return _upload_response(_get_upload(session, upload_id, current_user))
+
+
+@router.put("/uploads/{upload_id}", response_model=ChunkedUploadResponse)
+async def put_upload_chunk(
+    upload_id: int,
+    offset: int,
+    request: Request,
+    current_user: User = Depends(get_current_user),
+    session: Session = Depends(get_session),
+):
+    """Append the raw request body to a resumable upload at offset."""
+    upload = _get_upload(session, upload_id, current_user)
+    # Checked before the spool file is opened, a completed upload's file
+    # belongs to its ingestion job
+    _check_chunk_offset(upload, offset)
+
+    with _open_spool_file(session, upload) as spool_file:
+        # One writer per upload: a chunk retried while the first attempt is
+        # still being written is turned away instead of writing over it
+        try:
+            fcntl.flock(spool_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
             raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="No valid messages found in the file",
+                status_code=status.HTTP_409_CONFLICT,
+                detail="Another chunk of the upload is being written",
             )
 
-        # Extract participants
-        participants = list(set(msg["sender"] for msg in parsed_messages))
+        # The upload may have moved on before the lock was taken
+        session.refresh(upload)
+        _check_chunk_offset(upload, offset)
+
+        # Drop anything past the last recorded offset, e.g. from a chunk that
+        # was cut off before its offset was saved
+        spool_file.truncate(offset)
+        spool_file.seek(offset)
+
+        try:
+            async for chunk in request.stream():
+                if (
+                    upload.size is not None
+                    and spool_file.tell() + len(chunk) > upload.size
+                ):
+                    raise HTTPException(
+                        status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                        detail="Chunk goes past the size of the upload",
+                    )
+                await run_in_threadpool(spool_file.write, chunk)
+        finally:
+            # Keep whatever arrived, the client resumes from there
+            spool_file.flush()
+            advanced = _advance_upload(session, upload, offset, spool_file.tell())
+
+    if not advanced:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Upload changed while the chunk was written",
+        )
+
+    session.refresh(upload)
+    return _upload_response(upload)
 
-        # Create chat session
-        chat_session = ChatSession(
-            user_id=current_user.id,
-            filename=file.filename,
-            total_messages=len(parsed_messages),
-            participants=json.dumps(participants),
+
+def _check_chunk_offset(upload: ChunkedUpload, offset: int) -> None:
+    if upload.job_id is not None:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Upload is already complete",
+        )
+    if offset != upload.received:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"Upload offset is {upload.received}, not {offset}",
+        )
+
+
+def _open_spool_file(session: Session, upload: ChunkedUpload) -> BinaryIO:
+    """Open the spool file of an upload for writing in place.
+
+    The file is gone once the upload was completed and ingested, or expired.
+    """
+    try:
+        return open(upload.spool_path, "r+b")
+    except FileNotFoundError:
+        session.refresh(upload)
+        if upload.job_id is not None:
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail="Upload is already complete",
+            )
+        raise HTTPException(
+            status_code=status.HTTP_410_GONE, detail="Upload has expired"
+        )
+
+
+def _advance_upload(
+    session: Session, upload: ChunkedUpload, offset: int, received: int
+) -> bool:
+    """Record the bytes received by an upload, if it is still at offset.
+
+    Returns whether the upload was updated.
+    """
+    result = session.exec(
+        update(ChunkedUpload)
+        .where(
+            ChunkedUpload.id == upload.id,
+            ChunkedUpload.received == offset,
+            ChunkedUpload.job_id.is_(None),
+        )
+        .values(received=received, updated_at=datetime.utcnow())
+    )
+    session.commit()
+    return result.rowcount == 1
+
+
+@router.post(
+    "/uploads/{upload_id}/complete",
+    response_model=IngestionJobResponse,
+    status_code=status.HTTP_202_ACCEPTED,
+)
+async def complete_chunked_upload(
+    upload_id: int,
+    current_user: User = Depends(get_current_user),
+    session: Session = Depends(get_session),
+    ingestion_pool: Optional[IngestionWorkerPool] = Depends(get_ingestion_pool),
+    executor: Optional[Executor] = Depends(get_parse_executor),
+):
+    """Finish a resumable upload and queue it for processing.
+
+    Completing an upload twice returns the job created the first time.
+    """
+    upload = _get_upload(session, upload_id, current_user)
+    if upload.job_id is None:
+        with _open_spool_file(session, upload) as spool_file:
+            # Waits for a chunk that is still being written, and makes
+            # concurrent completions create a single job
+            await run_in_threadpool(fcntl.flock, spool_file, fcntl.LOCK_EX)
+            session.refresh(upload)
+            if upload.job_id is None:
+                return _job_response(
+                    await _complete_upload(
+                        session, upload, current_user, ingestion_pool, executor
+                    )
+                )
+
+    job = session.get(IngestionJob, upload.job_id)
+    if job is None:
+        raise HTTPException(
+            status_code=status.HTTP_410_GONE, detail="Upload has expired"
         )
+    return _job_response(job)
+
+
+async def _complete_upload(
+    session: Session,
+    upload: ChunkedUpload,
+    user: User,
+    ingestion_pool: Optional[IngestionWorkerPool],
+    executor: Optional[Executor],
+) -> IngestionJob:
+    """Start the ingestion job of an upload whose spool file is locked."""
+    if upload.size is not None and upload.received != upload.size:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"Upload is incomplete, {upload.received} of {upload.size} bytes received",
+        )
+    if not upload.received:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail="Upload is empty"
+        )
+
+    chat_session = None
+    if upload.session_id is not None:
+        chat_session = _get_append_target(session, upload.session_id, user)
+
+    # The job takes over the spool file; it runs inline without a pool, so
+    # link it to the upload first
+    return await _start_ingestion(
+        session,
+        user,
+        upload.filename,
+        upload.spool_path,
+        chat_session,
+        ingestion_pool,
+        executor,
+        upload=upload,
+    )
 
+
+@router.delete("/uploads/{upload_id}", response_model=StatusResponse)
+async def delete_chunked_upload(
+    upload_id: int,
+    current_user: User = Depends(get_current_user),
+    session: Session = Depends(get_session),
+):
+    """Abandon a resumable upload and remove what was received."""
+    upload = _get_upload(session, upload_id, current_user)
+
+    if upload.job_id is None:
+        await run_in_threadpool(remove_spool_file, upload.spool_path)
+    session.delete(upload)
+    session.commit()
+
+    return StatusResponse(success=True, message="Upload deleted successfully")
+
+
+def _get_upload(session: Session, upload_id: int, user: User) -> ChunkedUpload:
+    upload = session.exec(
+        select(ChunkedUpload).where(
+            ChunkedUpload.id == upload_id, ChunkedUpload.user_id == user.id
+        )
+    ).first()
+
+    if not upload:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="Upload not found"
+        )
+
+    return upload
+
+
+def _upload_response(upload: ChunkedUpload) -> ChunkedUploadResponse:
+    return ChunkedUploadResponse(
+        id=upload.id,
+        filename=upload.filename,
+        size=upload.size,
+        offset=upload.received,
+        session_id=upload.session_id,
+        job_id=upload.job_id,
+        created_at=upload.created_at,
+        updated_at=upload.updated_at,
+    )
+
+
+def _get_append_target(session: Session, session_id: int, user: User) -> ChatSession:
+    """Get a chat session an upload can be appended to."""
+    chat_session = session.exec(
+        select(ChatSession).where(
+            ChatSession.id == session_id,
+            ChatSession.user_id == user.id,
+            ChatSession.deleting.is_(False),
+        )
+    ).first()
+
+    if not chat_session:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="Chat session not found"
+        )
+
+    # Two jobs appending at once would both store the same delta
+    active_job = session.exec(
+        select(IngestionJob).where(
+            IngestionJob.session_id == session_id,
+            IngestionJob.status.in_([JobStatus.PENDING, JobStatus.RUNNING]),
+        )
+    ).first()
+
+    if active_job:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Chat session is still being processed",
+        )
+
+    return chat_session
+
+
+async def _start_ingestion(
+    session: Session,
+    user: User,
+    filename: str,
+    spool_path: str,
+    chat_session: Optional[ChatSession],
+    ingestion_pool: Optional[IngestionWorkerPool],
+    executor: Optional[Executor],
+    upload: Optional[ChunkedUpload] = None,
+) -> IngestionJob:
+    """Create an ingestion job for a spooled upload and start it.
+
+    A new chat session is created unless one is given to append to.
+    """
+    append = chat_session is not None
+    if chat_session is None:
+        chat_session = ChatSession(
+            user_id=user.id,
+            filename=filename,
+            total_messages=0,
+            participants=json.dumps([]),
+        )
         session.add(chat_session)
         session.commit()
         session.refresh(chat_session)
 
-        # Add messages
-        for msg_data in parsed_messages:
-            message = ParsedMessage(
-                session_id=chat_session.id,
-                timestamp=msg_data["timestamp"],
-                sender=msg_data["sender"],
-                content=msg_data["content"],
-                is_user=msg_data["is_user"],
-            )
-            session.add(message)
+    job = IngestionJob(
+        user_id=user.id,
+        session_id=chat_session.id,
+        filename=filename,
+        spool_path=spool_path,
+        append=append,
+    )
+    session.add(job)
+    session.commit()
+    session.refresh(job)
 
+    if upload is not None:
+        upload.job_id = job.id
+        upload.updated_at = datetime.utcnow()
+        session.add(upload)
         session.commit()
 
-        return ChatSessionResponse(
-            id=chat_session.id,
-            user_id=chat_session.user_id,
-            filename=chat_session.filename,
-            upload_date=chat_session.upload_date,
-            total_messages=chat_session.total_messages,
-            participants=chat_session.participants,
+    if ingestion_pool is not None:
+        ingestion_pool.submit(job.id)
+    else:
+        # No worker pool running, process the job before responding
+        await run_in_threadpool(run_ingestion_job, job.id, executor)
+        session.refresh(job)
+
+    return job
+
+
+@router.get("/jobs/{job_id}", response_model=IngestionJobResponse)
+async def get_ingestion_job(
+    job_id: int,
+    current_user: User = Depends(get_current_user),
+    session: Session = Depends(get_session),
+):
+    """Get the status and progress of an ingestion job."""
+    job = session.exec(
+        select(IngestionJob).where(
+            IngestionJob.id == job_id, IngestionJob.user_id == current_user.id
         )
+    ).first()
 
-    except Exception as e:
+    if not job:
         raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"Error processing file: {str(e)}",
+            status_code=status.HTTP_404_NOT_FOUND, detail="Ingestion job not found"
         )
 
+    return _job_response(job)
+
+
+def _job_response(job: IngestionJob) -> IngestionJobResponse:
+    return IngestionJobResponse(
+        id=job.id,
+        session_id=job.session_id,
+        filename=job.filename,
+        append=job.append,
+        status=job.status,
+        lines_read=job.lines_read,
+        messages_stored=job.messages_stored,
+        failed_lines=job.failed_lines,
+        error=job.error,
+        created_at=job.created_at,
+        updated_at=job.updated_at,
+    )
+
+
+@router.get("/search", response_model=MessageSearchResponse)
+async def search_chat_messages(
+    q: str = Query(..., min_length=1, description="Words or quoted phrases to find"),
+    session_id: Optional[int] = None,
+    sender: Optional[str] = None,
+    start: Optional[datetime] = Query(None, description="Earliest message time"),
+    end: Optional[datetime] = Query(None, description="Messages before this time"),
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = Query(None, description="next_cursor of a previous page"),
+    current_user: User = Depends(get_current_user),
+    session: Session = Depends(get_session),
+):
+    """Search the messages of the user's chat sessions.
+
+    q takes web search syntax: quoted phrases, OR and -word. Results are
+    ranked best match first, with the matching words highlighted, and can
+    be limited to one session, sender or time range.
+    """
+    after = None
+    if cursor is not None:
+        try:
+            direction, (rank, message_id) = decode_cursor(cursor)
+            after = (float(rank), int(message_id))
+        except (ValueError, TypeError):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor"
+            )
+        if direction != NEXT:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor"
+            )
+
+    # One extra row tells whether there is another page
+    rows = search_messages(
+        session,
+        current_user.id,
+        q,
+        limit + 1,
+        session_id=session_id,
+        sender=sender,
+        start=start,
+        end=end,
+        after=after,
+    )
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(NEXT, (rows[-1].rank, rows[-1].id))
+
+    return MessageSearchResponse(
+        results=[
+            MessageSearchResult(
+                id=row.id,
+                session_id=row.session_id,
+                timestamp=row.timestamp,
+                sender=row.sender,
+                content=row.content,
+                is_user=row.is_user,
+                rank=row.rank,
+                highlight=row.highlight,
+            )
+            for row in rows
+        ],
+        next_cursor=next_cursor,
+    )
+
 
 @router.get("/sessions", response_model=List[ChatSessionResponse])
 async def get_chat_sessions(
@@ -143,7 +594,9 @@ async def get_chat_sessions(
     """Get user's chat sessions."""
     sessions_query = (
         select(ChatSession)
-        .where(ChatSession.user_id == current_user.id)
+        .where(
+            ChatSession.user_id == current_user.id, ChatSession.deleting.is_(False)
+        )
         .offset(offset)
         .limit(limit)
     )
@@ -163,16 +616,30 @@ async def get_chat_sessions(
     ]
 
 
-@router.get("/sessions/{session_id}", response_model=ChatSessionDetailResponse)
+@router.get(
+    "/sessions/{session_id}",
+    response_model=ChatSessionDetailResponse,
+    responses={200: {"content": {NDJSON_MEDIA_TYPE: {}}}},
+)
 async def get_chat_session_detail(
     session_id: int,
+    request: Request,
+    stream: bool = Query(False, description="Stream the session as NDJSON"),
     current_user: User = Depends(get_current_user),
     session: Session = Depends(get_session),
 ):
-    """Get full chat session with all messages."""
+    """Get full chat session with all messages.
+
+    With stream=true or an Accept: application/x-ndjson header the session
+    is streamed as newline-delimited JSON instead: the first line holds the
+    session without its messages, then one line per message in
+    chronological order.
+    """
     chat_session = session.exec(
         select(ChatSession).where(
-            ChatSession.id == session_id, ChatSession.user_id == current_user.id
+            ChatSession.id == session_id,
+            ChatSession.user_id == current_user.id,
+            ChatSession.deleting.is_(False),
         )
     ).first()
 
@@ -181,6 +648,19 @@ async def get_chat_session_detail(
             status_code=status.HTTP_404_NOT_FOUND, detail="Chat session not found"
         )
 
+    if stream or NDJSON_MEDIA_TYPE in request.headers.get("accept", ""):
+        header = ChatSessionResponse(
+            id=chat_session.id,
+            user_id=chat_session.user_id,
+            filename=chat_session.filename,
+            upload_date=chat_session.upload_date,
+            total_messages=chat_session.total_messages,
+            participants=chat_session.participants,
+        )
+        return StreamingResponse(
+            _stream_session_ndjson(header), media_type=NDJSON_MEDIA_TYPE
+        )
+
     messages = session.exec(
         select(ParsedMessage).where(ParsedMessage.session_id == session_id)
     ).all()
@@ -206,16 +686,68 @@ async def get_chat_session_detail(
     )
 
 
+def _stream_session_ndjson(header: ChatSessionResponse) -> Iterator[str]:
+    """Yield a chat session and its messages as NDJSON lines.
+
+    Runs after the request's session is closed, so it opens its own. Rows
+    are fetched through a server-side cursor, one batch in memory at a time.
+    """
+    yield header.model_dump_json(exclude_none=True) + "\n"
+
+    query = (
+        select(
+            ParsedMessage.id,
+            ParsedMessage.session_id,
+            ParsedMessage.timestamp,
+            ParsedMessage.sender,
+            ParsedMessage.content,
+            ParsedMessage.is_user,
+        )
+        .where(ParsedMessage.session_id == header.id)
+        .order_by(ParsedMessage.timestamp, ParsedMessage.id)
+        .execution_options(yield_per=NDJSON_BATCH_SIZE)
+    )
+
+    with Session(engine) as session:
+        for rows in session.exec(query).partitions():
+            yield "".join(
+                json.dumps(
+                    {
+                        "id": row.id,
+                        "session_id": row.session_id,
+                        "timestamp": row.timestamp.isoformat(),
+                        "sender": row.sender,
+                        "content": row.content,
+                        "is_user": row.is_user,
+                    }
+                )
+                + "\n"
+                for row in rows
+            )
+
+
 @router.delete("/sessions/{session_id}", response_model=StatusResponse)
 async def delete_chat_session(
     session_id: int,
+    background_tasks: BackgroundTasks,
+    background: Optional[bool] = Query(
+        None, description="Purge the messages in the background"
+    ),
     current_user: User = Depends(get_current_user),
     session: Session = Depends(get_session),
 ):
-    """Delete a chat session."""
+    """Delete a chat session.
+
+    The messages are removed by the database in the same statement. Sessions
+    with more than CHAT_DELETE_BACKGROUND_THRESHOLD messages, or any session
+    when background=true, are hidden right away and purged in batches after
+    the response is sent.
+    """
     chat_session = session.exec(
         select(ChatSession).where(
-            ChatSession.id == session_id, ChatSession.user_id == current_user.id
+            ChatSession.id == session_id,
+            ChatSession.user_id == current_user.id,
+            ChatSession.deleting.is_(False),
         )
     ).first()
 
@@ -224,35 +756,50 @@ async def delete_chat_session(
             status_code=status.HTTP_404_NOT_FOUND, detail="Chat session not found"
         )
 
-    # Delete associated messages first
-    messages = session.exec(
-        select(ParsedMessage).where(ParsedMessage.session_id == session_id)
-    ).all()
+    if background is None:
+        background = chat_session.total_messages > CHAT_DELETE_BACKGROUND_THRESHOLD
 
-    for message in messages:
-        session.delete(message)
+    if background:
+        mark_chat_session_deleting(session, session_id)
+        background_tasks.add_task(purge_chat_session, session_id)
+        return StatusResponse(success=True, message="Chat session is being deleted")
 
-    session.delete(chat_session)
-    session.commit()
+    discard_chat_session(session, session_id)
 
     return StatusResponse(success=True, message="Chat session deleted successfully")
 
 
-@router.get(
-    "/sessions/{session_id}/messages", response_model=List[ParsedMessageResponse]
-)
+@router.get("/sessions/{session_id}/messages", response_model=ParsedMessagePageResponse)
 async def get_session_messages(
     session_id: int,
-    limit: int = 50,
-    offset: int = 0,
+    limit: int = Query(50, ge=1, le=500),
+    cursor: Optional[str] = Query(
+        None, description="next_cursor or prev_cursor of a previous page"
+    ),
+    start: Optional[datetime] = Query(
+        None, alias="from", description="Earliest message time"
+    ),
+    end: Optional[datetime] = Query(
+        None, alias="to", description="Messages before this time"
+    ),
+    sender: Optional[str] = None,
+    is_user: Optional[bool] = None,
     current_user: User = Depends(get_current_user),
     session: Session = Depends(get_session),
 ):
-    """Get paginated messages from a chat session."""
+    """Get a page of messages from a chat session in chronological order.
+
+    Pages are keyed on (timestamp, id), so every page costs the same no
+    matter how deep it is. Messages can be limited to a [from, to) time
+    range and to one sender or to the user's own messages; pass the same
+    filters along with a cursor.
+    """
     # Verify session belongs to user
     chat_session = session.exec(
         select(ChatSession).where(
-            ChatSession.id == session_id, ChatSession.user_id == current_user.id
+            ChatSession.id == session_id,
+            ChatSession.user_id == current_user.id,
+            ChatSession.deleting.is_(False),
         )
     ).first()
 
@@ -261,21 +808,69 @@ async def get_session_messages(
             status_code=status.HTTP_404_NOT_FOUND, detail="Chat session not found"
         )
 
-    messages = session.exec(
-        select(ParsedMessage)
-        .where(ParsedMessage.session_id == session_id)
-        .offset(offset)
-        .limit(limit)
-    ).all()
+    sort_key = tuple_(ParsedMessage.timestamp, ParsedMessage.id)
+    query = select(ParsedMessage).where(ParsedMessage.session_id == session_id)
+    direction = NEXT
+
+    if start is not None:
+        query = query.where(ParsedMessage.timestamp >= start)
+    if end is not None:
+        query = query.where(ParsedMessage.timestamp < end)
+    if sender is not None:
+        query = query.where(ParsedMessage.sender == sender)
+    if is_user is not None:
+        query = query.where(ParsedMessage.is_user == is_user)
+
+    if cursor is not None:
+        try:
+            direction, (timestamp, message_id) = decode_cursor(cursor)
+            position = (datetime.fromisoformat(timestamp), int(message_id))
+        except (ValueError, TypeError):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor"
+            )
 
-    return [
-        ParsedMessageResponse(
-            id=msg.id,
-            session_id=msg.session_id,
-            timestamp=msg.timestamp,
-            sender=msg.sender,
-            content=msg.content,
-            is_user=msg.is_user,
-        )
-        for msg in messages
-    ]
+        if direction == NEXT:
+            query = query.where(sort_key > position)
+        else:
+            query = query.where(sort_key < position)
+
+    if direction == NEXT:
+        query = query.order_by(ParsedMessage.timestamp, ParsedMessage.id)
+    else:
+        query = query.order_by(ParsedMessage.timestamp.desc(), ParsedMessage.id.desc())
+
+    # One extra row tells whether there is another page in this direction
+    messages = list(session.exec(query.limit(limit + 1)).all())
+    has_more = len(messages) > limit
+    messages = messages[:limit]
+    if direction == PREV:
+        messages.reverse()
+
+    # A page reached through a cursor has rows on the side it came from
+    if direction == NEXT:
+        has_next, has_prev = has_more, cursor is not None
+    else:
+        has_next, has_prev = True, has_more
+
+    next_cursor = prev_cursor = None
+    if messages and has_next:
+        next_cursor = encode_cursor(NEXT, (messages[-1].timestamp, messages[-1].id))
+    if messages and has_prev:
+        prev_cursor = encode_cursor(PREV, (messages[0].timestamp, messages[0].id))
+
+    return ParsedMessagePageResponse(
+        messages=[
+            ParsedMessageResponse(
+                id=msg.id,
+                session_id=msg.session_id,
+                timestamp=msg.timestamp,
+                sender=msg.sender,
+                content=msg.content,
+                is_user=msg.is_user,
+            )
+            for msg in messages
+        ],
+        next_cursor=next_cursor,
+        prev_cursor=prev_cursor,
+    )
@@ -26,7 +26,8 @@ async def get_dashboard_stats(
     sessions_count = (
         session.exec(
             select(func.count(ChatSession.id)).where(
-                ChatSession.user_id == current_user.id
+                ChatSession.user_id == current_user.id,
+                ChatSession.deleting.is_(False),
             )
         ).first()
         or 0
@@ -37,7 +38,10 @@ async def get_dashboard_stats(
         session.exec(
             select(func.count(ParsedMessage.id))
             .join(ChatSession)
-            .where(ChatSession.user_id == current_user.id)
+            .where(
+                ChatSession.user_id == current_user.id,
+                ChatSession.deleting.is_(False),
+            )
         ).first()
         or 0
     )
@@ -213,7 +217,9 @@ async def get_recent_activity(
     # Get recent chat sessions
     recent_sessions = session.exec(
         select(ChatSession)
-        .where(ChatSession.user_id == current_user.id)
+        .where(
+            ChatSession.user_id == current_user.id, ChatSession.deleting.is_(False)
+        )
         .order_by(ChatSession.upload_date.desc())
         .limit(limit)
     ).all()
@@ -154,7 +154,9 @@ async def extract_memories_from_session(
     # Verify session belongs to user
     chat_session = session.exec(
         select(ChatSession).where(
-            ChatSession.id == session_id, ChatSession.user_id == current_user.id
+            ChatSession.id == session_id,
+            ChatSession.user_id == current_user.id,
+            ChatSession.deleting.is_(False),
         )
     ).first()
 
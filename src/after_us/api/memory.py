@@ -1,5 +1,5 @@
 from fastapi import APIRouter, Depends, HTTPException, status, Query
-from sqlmodel import Session, select
+from sqlmodel import Session, func, select
 from typing import List, Optional
 from datetime import datetime
 from ..models.user import User
@@ -170,7 +170,9 @@ async def extract_memories_from_session(
     # Verify session belongs to user
     chat_session = session.exec(
         select(ChatSession).where(
-            ChatSession.id == session_id, ChatSession.user_id == current_user.id
+            ChatSession.id == session_id,
+            ChatSession.user_id == current_user.id,
+            ChatSession.deleting.is_(False),
         )
     ).first()
 
@@ -179,9 +181,12 @@ async def extract_memories_from_session(
             status_code=status.HTTP_404_NOT_FOUND, detail="Chat session not found"
         )
 
-    # Get messages from the session
+    # Get messages from the session, short ones are never kept as memories
     messages = session.exec(
-        select(ParsedMessage).where(ParsedMessage.session_id == session_id)
+        select(ParsedMessage).where(
+            ParsedMessage.session_id == session_id,
+            func.length(ParsedMessage.content) > 50,
+        )
     ).all()
 
     if not messages:
@@ -208,7 +213,7 @@ async def extract_memories_from_session(
     for message in messages:
         content_lower = message.content.lower()
         for keyword, memory_type in memory_keywords.items():
-            if keyword in content_lower and len(message.content) > 50:
+            if keyword in content_lower:
                 # Create a memory from this message
                 memory = Memory(
                     user_id=current_user.id,
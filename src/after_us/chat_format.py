@@ -0,0 +1,310 @@
+"""Parsing of WhatsApp export lines.
+
+Kept apart from the app's settings and services, so the worker processes
+that parse large exports only import this module.
+"""
+
+import re
+from dataclasses import dataclass, replace
+from datetime import date, datetime
+from functools import lru_cache
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+
+FORMAT_SAMPLE_LINES = 500
+
+# Upper bound for the timestamp caches before they are reset
+TIMESTAMP_CACHE_SIZE = 65536
+_MISSING = object()
+
+# Loose pattern used only while sniffing the layout, it accepts every
+# variant we know about:
+#   Android: 31/12/2021, 9:41 PM - Name: Message
+#   iOS:     [31/12/2021, 21:41:05] Name: Message
+SNIFF_PATTERN = re.compile(
+    r"[\ufeff\u200e]?(?P<open>\[)?"
+    r"(?P<first>\d{1,2})(?P<sep>[/.\-])(?P<second>\d{1,2})[/.\-](?P<year>\d{2}|\d{4})"
+    r"(?P<comma>,?\s+)(?P<hour>\d{1,2})(?P<time_sep>[:.])(?P<minute>\d{2})"
+    r"(?:[:.](?P<seconds>\d{2}))?"
+    r"(?:\s*(?P<ampm>[AaPp])\.?\s?[Mm]\.?)?"
+    r"(?P<close>\])?(?P<dash>\s*-?\s*)[^:]+:\s*\S"
+)
+
+
+# A parsed message: (timestamp, sender, content, is_user). Plain tuples are
+# cheaper to build than dicts and much smaller to send back from a worker
+ParsedMessage = Tuple[datetime, str, str, bool]
+
+
+class ParsedBlock(NamedTuple):
+    """Messages parsed from a block of export lines."""
+
+    lines: int
+    messages: List[ParsedMessage]
+    failed: int  # Lines shaped like a message that did not parse
+
+
+@dataclass(frozen=True)
+class ChatFormat:
+    """Exact layout of a WhatsApp export, as detected from its first lines."""
+
+    bracketed: bool = False  # iOS style "[date, time] Name: ..."
+    day_first: bool = True  # dd/mm rather than mm/dd
+    hour12: bool = True  # AM/PM clock rather than 24h
+    seconds: bool = False  # time carries seconds
+    date_sep: str = "/"
+    year_digits: int = 4
+    # Literal separators, so the line pattern can match them exactly
+    date_time_sep: str = ", "
+    time_sep: str = ":"
+    sender_sep: str = " - "
+
+
+def detect_chat_format(lines: Iterable[str]) -> Optional[ChatFormat]:
+    """Detect the export layout from a sample of lines.
+
+    Day and month order is decided from any field above 12, and defaults to
+    dd/mm when the sample is ambiguous. Returns None if no line looks like a
+    message.
+    """
+    votes: Dict[ChatFormat, int] = {}
+    max_first = max_second = 0
+
+    for line in lines:
+        match = SNIFF_PATTERN.match(line)
+        if not match:
+            continue
+
+        bracketed = bool(match.group("open") and match.group("close"))
+        if not bracketed and "-" not in match.group("dash"):
+            continue
+
+        max_first = max(max_first, int(match.group("first")))
+        max_second = max(max_second, int(match.group("second")))
+
+        chat_format = ChatFormat(
+            bracketed=bracketed,
+            hour12=match.group("ampm") is not None,
+            seconds=match.group("seconds") is not None,
+            date_sep=match.group("sep"),
+            year_digits=len(match.group("year")),
+            date_time_sep=match.group("comma"),
+            time_sep=match.group("time_sep"),
+            sender_sep=match.group("dash"),
+        )
+        votes[chat_format] = votes.get(chat_format, 0) + 1
+
+    if not votes:
+        return None
+
+    chat_format = max(votes, key=votes.get)
+    day_first = max_first > 12 or max_second <= 12
+
+    return replace(chat_format, day_first=day_first)
+
+
+def detect_day_first(lines: Iterable[str]) -> Optional[bool]:
+    """Tell dd/mm dates from mm/dd ones by the first field above 12.
+
+    Returns None if no line settles it, as when every date so far falls on
+    the 12th of a month or earlier.
+    """
+    for line in lines:
+        match = SNIFF_PATTERN.match(line)
+        if not match:
+            continue
+        if int(match.group("first")) > 12:
+            return True
+        if int(match.group("second")) > 12:
+            return False
+    return None
+
+
+@lru_cache(maxsize=None)
+def compile_date_pattern(chat_format: ChatFormat) -> "re.Pattern[str]":
+    """Build the specialised pattern for the date part of a timestamp."""
+    sep = re.escape(chat_format.date_sep)
+    pattern = r"[\ufeff\u200e]?"
+    if chat_format.bracketed:
+        pattern += r"\["
+    pattern += rf"(\d\d?){sep}(\d\d?){sep}(\d{{{chat_format.year_digits}}})"
+    return re.compile(pattern)
+
+
+@lru_cache(maxsize=None)
+def compile_time_pattern(chat_format: ChatFormat) -> "re.Pattern[str]":
+    """Build the specialised pattern for the time part of a timestamp."""
+    sep = re.escape(chat_format.time_sep)
+    pattern = rf"(\d\d?){sep}(\d\d)"
+    if chat_format.seconds:
+        pattern += rf"{sep}(\d\d)"
+    else:
+        pattern += "()"
+    if chat_format.hour12:
+        # Only runs on cache misses, so accept any spacing and marker style
+        pattern += r"\s*([AaPp])\.?\s?[Mm]\.?"
+    else:
+        pattern += "()"
+    return re.compile(pattern)
+
+
+class WhatsAppParser:
+    """Line parser specialised for a single export layout.
+
+    Lines are split on the layout's literal separators instead of running a
+    regex per line. Timestamps are decoded with integer arithmetic and cached
+    at three levels: the exact timestamp string, its day and its time of day
+    (per minute, or per second when the layout has seconds). Exports are
+    chronological, so nearly every lookup is a hit and the specialised
+    patterns only run when a new day or minute shows up.
+    """
+
+    def __init__(self, chat_format: ChatFormat, user_name: str):
+        self.chat_format = chat_format
+        self.user_name = user_name.strip()
+        self._date_match = compile_date_pattern(chat_format).fullmatch
+        self._time_match = compile_time_pattern(chat_format).fullmatch
+        self._date_time_sep = chat_format.date_time_sep
+        self._sender_sep = (
+            "]" + chat_format.sender_sep
+            if chat_format.bracketed
+            else chat_format.sender_sep
+        )
+        self._stamps: Dict[str, Optional[datetime]] = {}
+        self._days: Dict[str, Optional[Tuple[int, int, int]]] = {}
+        self._minutes: Dict[str, Optional[Tuple[int, int, int]]] = {}
+        # One string per sender, so pickled blocks refer back to it
+        self._senders: Dict[str, str] = {}
+        # Skipped lines that looked like the start of a message
+        self.failed_lines = 0
+
+    def _decode_day(self, text: str) -> Optional[Tuple[int, int, int]]:
+        """Decode the date part of a timestamp into (year, month, day)."""
+        match = self._date_match(text)
+        if not match:
+            return None
+
+        first, second, year = match.groups()
+        day, month = (first, second) if self.chat_format.day_first else (second, first)
+        year = int(year)
+        if year < 100:
+            year += 2000
+
+        try:
+            date(year, int(month), int(day))
+        except ValueError:
+            return None
+        return year, int(month), int(day)
+
+    def _decode_minute(self, text: str) -> Optional[Tuple[int, int, int]]:
+        """Decode the time part of a timestamp into (hour, minute, second)."""
+        match = self._time_match(text)
+        if not match:
+            return None
+
+        hour, minute, second, ampm = match.groups()
+        hour, minute, second = int(hour), int(minute), int(second or 0)
+
+        if ampm:
+            if not 1 <= hour <= 12:
+                return None
+            hour %= 12
+            if ampm in "Pp":
+                hour += 12
+
+        if hour > 23 or minute > 59 or second > 59:
+            return None
+        return hour, minute, second
+
+    def _decode_timestamp(self, stamp: str) -> Optional[datetime]:
+        """Decode a timestamp string, or return None if it is not valid."""
+        day_text, sep, time_text = stamp.partition(self._date_time_sep)
+        if not sep:
+            return None
+
+        try:
+            day = self._days[day_text]
+        except KeyError:
+            day = self._days[day_text] = self._decode_day(day_text)
+
+        try:
+            minute = self._minutes[time_text]
+        except KeyError:
+            minute = self._minutes[time_text] = self._decode_minute(time_text)
+
+        if day is None or minute is None:
+            return None
+        return datetime(*day, *minute)
+
+    def _lookup_timestamp(self, stamp: str) -> Optional[datetime]:
+        """Return the cached datetime for a timestamp string, decoding it once."""
+        if len(self._stamps) >= TIMESTAMP_CACHE_SIZE:
+            self._stamps.clear()
+            self._days.clear()
+            self._minutes.clear()
+        timestamp = self._stamps[stamp] = self._decode_timestamp(stamp)
+        return timestamp
+
+    def _skip(self, line: str) -> None:
+        """Count a skipped line as failed if it looks like a message.
+
+        Blank lines, the continuation lines of multi-line messages and
+        notices without a sender are not failures.
+        """
+        if SNIFF_PATTERN.match(line):
+            self.failed_lines += 1
+
+    def parse_lines(self, lines: Iterable[str]) -> Iterator[ParsedMessage]:
+        """Lazily parse lines into messages, skipping non-message lines.
+
+        This is the hot loop of every upload, so it works on locals only.
+        """
+        sender_sep = self._sender_sep
+        sender_offset = len(sender_sep)
+        user_name = self.user_name
+        stamps = self._stamps
+        lookup_timestamp = self._lookup_timestamp
+        senders = self._senders
+        skip = self._skip
+
+        for line in lines:
+            stamp_end = line.find(sender_sep)
+            if stamp_end <= 0:
+                skip(line)
+                continue
+
+            sender_start = stamp_end + sender_offset
+            sender_end = line.find(":", sender_start)
+            if sender_end <= sender_start:
+                skip(line)
+                continue
+
+            content = line[sender_end + 1 :].strip()
+            if not content:
+                continue
+
+            stamp = line[:stamp_end]
+            timestamp = stamps.get(stamp, _MISSING)
+            if timestamp is _MISSING:
+                timestamp = lookup_timestamp(stamp)
+            if timestamp is None:
+                skip(line)  # Skip lines without a valid timestamp
+                continue
+
+            sender = line[sender_start:sender_end].strip()
+            sender = senders.setdefault(sender, sender)
+            yield timestamp, sender, content, sender == user_name
+
+
+def count_lines(block: str) -> int:
+    """Count the lines in a block, including a final unterminated one."""
+    return block.count("\n") + (not block.endswith("\n"))
+
+
+def parse_block(block: str, chat_format: ChatFormat, user_name: str) -> ParsedBlock:
+    """Parse a block of whole lines with an already detected layout.
+
+    This is the entry point of the parse worker processes.
+    """
+    parser = WhatsAppParser(chat_format, user_name)
+    messages = list(parser.parse_lines(block.split("\n")))
+    return ParsedBlock(count_lines(block), messages, parser.failed_lines)
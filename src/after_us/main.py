@@ -1,8 +1,15 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
+from concurrent.futures import ProcessPoolExecutor
+import multiprocessing
+import threading
 
+from .config import CHAT_PARSE_WORKERS, CHAT_INGEST_WORKERS
 from .utils.database import create_db_and_tables
+from .services.ingestion_jobs import IngestionWorkerPool
+from .services.chat_purge import run_maintenance
+from .services.ai_backend import create_ai_backend
 from .api import (
     auth_router,
     chat_router,
@@ -19,8 +26,47 @@ async def lifespan(app: FastAPI):
     """Application lifespan manager."""
     # Create database tables on startup
     create_db_and_tables()
+
+    # Worker processes for parsing large chat exports. They are started on
+    # first use, once the server runs threads and holds database connections,
+    # so they are spawned rather than forked from it
+    app.state.parse_executor = (
+        ProcessPoolExecutor(
+            max_workers=CHAT_PARSE_WORKERS,
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+        if CHAT_PARSE_WORKERS > 0
+        else None
+    )
+
+    # Background ingestion of uploaded chats, resuming unfinished jobs
+    app.state.ingestion_pool = IngestionWorkerPool(
+        CHAT_INGEST_WORKERS, app.state.parse_executor
+    )
+    app.state.ingestion_pool.recover()
+    app.state.ingestion_pool.start()
+
+    # Finish deleting chat sessions whose purge was cut off by a restart, then
+    # keep dropping abandoned chunked uploads
+    app.state.maintenance_stop = threading.Event()
+    threading.Thread(
+        target=run_maintenance,
+        args=(app.state.maintenance_stop,),
+        name="maintenance",
+        daemon=True,
+    ).start()
+
+    # Pooled client of the model service writing AI replies
+    app.state.ai_backend = create_ai_backend()
+
     yield
 
+    app.state.maintenance_stop.set()
+    await app.state.ai_backend.aclose()
+    app.state.ingestion_pool.stop()
+    if app.state.parse_executor is not None:
+        app.state.parse_executor.shutdown(cancel_futures=True)
+
 
 app = FastAPI(
     title="After Us - Breakup Healing Assistant",
@@ -1,15 +1,22 @@
 from .user import User
-from .chat import ChatSession, ParsedMessage
+from .chat import ChatSession, ParsedMessage, ChatSessionStats
 from .memory import Memory
 from .healing import NoContactDay, ClosureActivity, AIPersonality
+from .ingestion import IngestionJob, JobStatus, ChunkedUpload
+from .insights import CachedInsights
 
 
 __all__ = [
     "User",
     "ChatSession",
     "ParsedMessage",
+    "ChatSessionStats",
     "Memory",
     "NoContactDay",
     "ClosureActivity",
     "AIPersonality",
+    "IngestionJob",
+    "JobStatus",
+    "ChunkedUpload",
+    "CachedInsights",
 ]
@@ -1,7 +1,14 @@
+from sqlalchemy import BigInteger, Column, Computed, Index, SmallInteger
+from sqlalchemy.dialects.postgresql import TSVECTOR
 from sqlmodel import SQLModel, Field, Relationship
 from datetime import datetime
+from datetime import date as Date
 from typing import Optional, List
 
+# Text search configuration of message content; chats mix languages, so words
+# are indexed as written, without stemming or stop words
+SEARCH_CONFIG = "simple"
+
 
 class ChatSession(SQLModel, table=True):
     id: Optional[int] = Field(default=None, primary_key=True)
@@ -10,18 +17,91 @@ class ChatSession(SQLModel, table=True):
     upload_date: datetime = Field(default_factory=datetime.utcnow)
     total_messages: int = Field(default=0)
     participants: str = Field(max_length=500)  # JSON string of participant names
+    # High-water mark used to skip already stored messages on re-upload
+    last_message_at: Optional[datetime] = Field(default=None)
+    boundary_hashes: Optional[str] = Field(
+        default=None, max_length=20000
+    )  # JSON list of hashes of the messages at last_message_at
+    deleting: bool = Field(default=False)  # Hidden while purged in the background
+    # Bumped whenever stored messages or stats are rewritten, see insights_cache
+    stats_version: int = Field(default=0)
 
-    # Relationship to messages
-    messages: List["ParsedMessage"] = Relationship(back_populates="session")
+    # Relationship to messages, the database deletes them with the session
+    messages: List["ParsedMessage"] = Relationship(
+        back_populates="session", sa_relationship_kwargs={"passive_deletes": True}
+    )
 
 
 class ParsedMessage(SQLModel, table=True):
+    __table_args__ = (
+        # Duplicate messages of a session are dropped on insert
+        Index(
+            "ix_parsedmessage_session_fingerprint",
+            "session_id",
+            "fingerprint",
+            unique=True,
+        ),
+        # Keyset pagination in (timestamp, id) order
+        Index("ix_parsedmessage_session_timestamp_id", "session_id", "timestamp", "id"),
+        # Time range lookups, rows are inserted roughly in timestamp order
+        Index("ix_parsedmessage_timestamp_brin", "timestamp", postgresql_using="brin"),
+        # Full-text search, the vector is kept up to date by the database
+        Column(
+            "search_vector",
+            TSVECTOR,
+            Computed(f"to_tsvector('{SEARCH_CONFIG}', content)", persisted=True),
+        ),
+        Index("ix_parsedmessage_search_vector", "search_vector", postgresql_using="gin"),
+    )
+    # Only used in search queries, never loaded with a message
+    __mapper_args__ = {"exclude_properties": ["search_vector"]}
+
     id: Optional[int] = Field(default=None, primary_key=True)
-    session_id: int = Field(foreign_key="chatsession.id", index=True)
+    session_id: int = Field(
+        foreign_key="chatsession.id", ondelete="CASCADE", index=True
+    )
     timestamp: datetime
     sender: str = Field(max_length=100)
     content: str = Field(max_length=5000)
     is_user: bool = Field(default=False)  # True if message is from the app user
+    fingerprint: Optional[int] = Field(
+        default=None, sa_type=BigInteger
+    )  # 64-bit hash of session, timestamp, sender and content
+    # Classified with the keyword lexicons when stored, None until backfilled
+    sentiment: Optional[int] = Field(
+        default=None, sa_type=SmallInteger
+    )  # 1 positive, -1 negative, 0 neutral
+    themes: Optional[int] = Field(
+        default=None, sa_type=SmallInteger
+    )  # Bitmask of the relationship themes mentioned
 
     # Relationship to session
     session: Optional[ChatSession] = Relationship(back_populates="messages")
+
+
+class ChatSessionStats(SQLModel, table=True):
+    """Message totals of one sender on one day of a chat session."""
+
+    __table_args__ = (
+        Index(
+            "ix_chatsessionstats_session_day_sender",
+            "session_id",
+            "day",
+            "sender",
+            "is_user",
+            unique=True,
+        ),
+    )
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+    session_id: int = Field(foreign_key="chatsession.id", ondelete="CASCADE")
+    day: Date
+    sender: str = Field(max_length=100)
+    is_user: bool = Field(default=False)
+    message_count: int = Field(default=0)
+    char_count: int = Field(default=0)  # Total length of the message contents
+    positive_count: int = Field(default=0)  # Messages with only positive words
+    negative_count: int = Field(default=0)  # Messages with only negative words
+    themes: int = Field(
+        default=0, sa_type=SmallInteger
+    )  # Bitmask of the relationship themes mentioned that day
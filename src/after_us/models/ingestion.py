@@ -0,0 +1,49 @@
+from sqlalchemy import BigInteger
+from sqlmodel import SQLModel, Field
+from datetime import datetime
+from typing import Optional
+from enum import Enum
+
+
+class JobStatus(str, Enum):
+    PENDING = "pending"
+    RUNNING = "running"
+    COMPLETED = "completed"
+    FAILED = "failed"
+
+
+class IngestionJob(SQLModel, table=True):
+    id: Optional[int] = Field(default=None, primary_key=True)
+    user_id: int = Field(foreign_key="user.id", index=True)
+    session_id: Optional[int] = Field(
+        default=None, foreign_key="chatsession.id", ondelete="SET NULL"
+    )
+    filename: str = Field(max_length=255)
+    spool_path: str = Field(max_length=1000)  # Uploaded file on local disk
+    append: bool = Field(default=False)  # Adds to an existing chat session
+    status: JobStatus = Field(default=JobStatus.PENDING, index=True)
+    lines_read: int = Field(default=0)
+    messages_stored: int = Field(default=0)
+    failed_lines: int = Field(default=0)  # Lines that did not parse as a message
+    error: Optional[str] = Field(default=None, max_length=1000)
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+    updated_at: datetime = Field(default_factory=datetime.utcnow)
+
+
+class ChunkedUpload(SQLModel, table=True):
+    id: Optional[int] = Field(default=None, primary_key=True)
+    user_id: int = Field(foreign_key="user.id", index=True)
+    session_id: Optional[int] = Field(
+        default=None, foreign_key="chatsession.id", ondelete="SET NULL"
+    )  # Session to append to once complete
+    filename: str = Field(max_length=255)
+    spool_path: str = Field(max_length=1000)  # Chunks are appended to this file
+    size: Optional[int] = Field(
+        default=None, sa_type=BigInteger
+    )  # Total size, if the client knows it
+    received: int = Field(default=0, sa_type=BigInteger)  # Bytes stored so far
+    job_id: Optional[int] = Field(
+        default=None, foreign_key="ingestionjob.id", ondelete="SET NULL"
+    )  # Set once the upload is complete
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+    updated_at: datetime = Field(default_factory=datetime.utcnow)
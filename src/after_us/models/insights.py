@@ -0,0 +1,25 @@
+from sqlalchemy import Index, Text
+from sqlmodel import SQLModel, Field
+from datetime import datetime
+from typing import Optional
+
+
+class CachedInsights(SQLModel, table=True):
+    __table_args__ = (
+        Index(
+            "ix_cachedinsights_session_kind_version",
+            "session_id",
+            "kind",
+            "version",
+            unique=True,
+        ),
+    )
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+    session_id: int = Field(foreign_key="chatsession.id", ondelete="CASCADE")
+    kind: str = Field(max_length=50)  # Which report, e.g. "insights"
+    version: int  # Version of the code that computed the report
+    message_count: int  # Messages in the session when it was computed
+    stats_version: int = Field(default=0)  # Stats version of the session then
+    payload: str = Field(sa_type=Text)  # The report as JSON
+    created_at: datetime = Field(default_factory=datetime.utcnow)
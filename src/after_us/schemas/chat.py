@@ -1,6 +1,7 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from datetime import datetime
 from typing import List, Optional
+from ..models.ingestion import JobStatus
 
 
 class ParsedMessageResponse(BaseModel):
@@ -12,6 +13,22 @@ class ParsedMessageResponse(BaseModel):
     is_user: bool
 
 
+class ParsedMessagePageResponse(BaseModel):
+    messages: List[ParsedMessageResponse]
+    next_cursor: Optional[str] = None
+    prev_cursor: Optional[str] = None
+
+
+class MessageSearchResult(ParsedMessageResponse):
+    rank: float
+    highlight: str  # Content with matches wrapped in <mark></mark>
+
+
+class MessageSearchResponse(BaseModel):
+    results: List[MessageSearchResult]
+    next_cursor: Optional[str] = None
+
+
 class ChatSessionResponse(BaseModel):
     id: int
     user_id: int
@@ -40,3 +57,68 @@ class ChatInsightsResponse(BaseModel):
     key_themes: List[str]
     relationship_health_score: Optional[float] = None
     recommendations: List[str]
+
+
+class CombinedInsightsRequest(BaseModel):
+    session_ids: List[int] = Field(min_length=1, max_length=50)
+
+
+class CombinedInsightsResponse(BaseModel):
+    session_ids: List[int]
+    relationship_duration: Optional[str] = None
+    communication_patterns: dict[str, str]
+    emotional_tone: dict[str, float]  # sentiment analysis scores
+    key_themes: List[str]
+    relationship_health_score: Optional[float] = None
+    recommendations: List[str]
+
+
+class ReplyLatencyResponse(BaseModel):
+    sender: str
+    is_user: bool
+    replies: int  # Messages answering one from another sender
+    median_seconds: float
+    p90_seconds: float
+
+
+class MonthlyVolumeResponse(BaseModel):
+    month: str  # YYYY-MM
+    messages: int
+
+
+class ChatPatternsResponse(BaseModel):
+    session_id: int
+    reply_latency: List[ReplyLatencyResponse]
+    activity_heatmap: List[List[int]]  # 7 days from Monday, by 24 hours
+    monthly_volume: List[MonthlyVolumeResponse]
+
+
+class IngestionJobResponse(BaseModel):
+    id: int
+    session_id: Optional[int]
+    filename: str
+    append: bool
+    status: JobStatus
+    lines_read: int
+    messages_stored: int
+    failed_lines: int
+    error: Optional[str] = None
+    created_at: datetime
+    updated_at: datetime
+
+
+class CreateChunkedUploadRequest(BaseModel):
+    filename: str
+    size: Optional[int] = Field(default=None, ge=0)
+    session_id: Optional[int] = None  # Append to this session once complete
+
+
+class ChunkedUploadResponse(BaseModel):
+    id: int
+    filename: str
+    size: Optional[int]
+    offset: int
+    session_id: Optional[int]
+    job_id: Optional[int]
+    created_at: datetime
+    updated_at: datetime
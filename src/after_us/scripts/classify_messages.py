@@ -0,0 +1,100 @@
+"""Backfill the sentiment and themes of stored messages.
+
+Walks parsedmessage in id order and classifies the rows stored before
+messages were classified at ingest. Each batch is committed on its own
+together with the daily stats of the days it touched, so the command can be
+stopped and run again at any time.
+
+    python -m after_us.scripts.classify_messages --batch-size 10000
+"""
+
+import argparse
+from datetime import datetime
+from typing import Dict, Tuple
+from sqlalchemy import bindparam, update
+from sqlmodel import Session, select
+from ..config import CHAT_INGEST_BATCH_SIZE
+from ..models.chat import ParsedMessage
+from ..services.bulk_insert import classify_messages
+from ..services.chat_stats import refresh_session_stats
+from ..services.insights_cache import invalidate_insights
+from ..utils.database import engine
+
+
+def backfill_classifications(
+    session: Session, batch_size: int = CHAT_INGEST_BATCH_SIZE
+) -> int:
+    """Classify the messages that have no sentiment yet.
+
+    Returns the number of messages classified.
+    """
+    table = ParsedMessage.__table__
+    set_classification = (
+        update(table)
+        .where(table.c.id == bindparam("message_id"))
+        .values(
+            sentiment=bindparam("message_sentiment"),
+            themes=bindparam("message_themes"),
+        )
+    )
+    classified = 0
+    last_id = 0
+
+    while True:
+        rows = session.exec(
+            select(
+                ParsedMessage.id,
+                ParsedMessage.session_id,
+                ParsedMessage.timestamp,
+                ParsedMessage.content,
+            )
+            .where(ParsedMessage.sentiment.is_(None), ParsedMessage.id > last_id)
+            .order_by(ParsedMessage.id)
+            .limit(batch_size)
+        ).all()
+        if not rows:
+            break
+        last_id = rows[-1].id
+
+        messages = [row._asdict() for row in rows]
+        classify_messages(messages)
+        session.execute(
+            set_classification,
+            [
+                {
+                    "message_id": message["id"],
+                    "message_sentiment": message["sentiment"],
+                    "message_themes": message["themes"],
+                }
+                for message in messages
+            ],
+        )
+
+        # Time range of the batch in every session it touched
+        touched: Dict[int, Tuple[datetime, datetime]] = {}
+        for row in rows:
+            first, last = touched.get(row.session_id, (row.timestamp, row.timestamp))
+            touched[row.session_id] = (
+                min(first, row.timestamp),
+                max(last, row.timestamp),
+            )
+        for session_id, (first, last) in touched.items():
+            refresh_session_stats(session, session_id, first, last)
+            invalidate_insights(session, session_id)
+        session.commit()
+
+        classified += len(rows)
+        print(f"up to message {last_id}: {classified} classified")
+
+    return classified
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--batch-size", type=int, default=CHAT_INGEST_BATCH_SIZE)
+    args = parser.parse_args()
+
+    with Session(engine) as session:
+        classified = backfill_classifications(session, args.batch_size)
+
+    print(f"done: {classified} messages classified")
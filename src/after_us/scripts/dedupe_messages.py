@@ -0,0 +1,168 @@
+"""Backfill message fingerprints and drop duplicate messages.
+
+Walks parsedmessage in id order, fills in the fingerprint of rows stored
+before fingerprints existed and deletes rows whose fingerprint an older
+message of the same session already has. A message repeated at the same
+timestamp is numbered by the copies stored before it, like ingest does, so
+genuine repeats are kept. Each batch is committed on its own,
+together with the recount of the session totals and of the daily stats of
+the days it removed messages from, so the command can be stopped and run
+again at any time.
+
+    python -m after_us.scripts.dedupe_messages --batch-size 10000
+"""
+
+import argparse
+from datetime import datetime
+from typing import Dict, List, Tuple
+from sqlalchemy import Row, bindparam, func, tuple_, update
+from sqlalchemy.orm import aliased
+from sqlmodel import Session, delete, select
+from ..config import CHAT_INGEST_BATCH_SIZE
+from ..models.chat import ChatSession, ParsedMessage
+from ..services.bulk_insert import message_fingerprint
+from ..services.chat_stats import refresh_session_stats
+from ..services.insights_cache import invalidate_insights
+from ..utils.database import engine
+
+
+def dedupe_messages(
+    session: Session, batch_size: int = CHAT_INGEST_BATCH_SIZE
+) -> Tuple[int, int]:
+    """Fingerprint unfingerprinted messages and remove the duplicates.
+
+    Returns the number of messages fingerprinted and removed.
+    """
+    table = ParsedMessage.__table__
+    set_fingerprint = (
+        update(table)
+        .where(table.c.id == bindparam("message_id"))
+        .values(fingerprint=bindparam("message_fingerprint"))
+    )
+    # Copies of a message stored before it at the same timestamp
+    earlier = aliased(ParsedMessage)
+    occurrence = (
+        select(func.count(earlier.id))
+        .where(
+            earlier.session_id == ParsedMessage.session_id,
+            earlier.timestamp == ParsedMessage.timestamp,
+            earlier.sender == ParsedMessage.sender,
+            earlier.content == ParsedMessage.content,
+            earlier.id < ParsedMessage.id,
+        )
+        .scalar_subquery()
+    )
+    fingerprinted = removed = 0
+    last_id = 0
+
+    while True:
+        rows = session.exec(
+            select(
+                ParsedMessage.id,
+                ParsedMessage.session_id,
+                ParsedMessage.timestamp,
+                ParsedMessage.sender,
+                ParsedMessage.content,
+                occurrence.label("occurrence"),
+            )
+            .where(ParsedMessage.fingerprint.is_(None), ParsedMessage.id > last_id)
+            .order_by(ParsedMessage.id)
+            .limit(batch_size)
+        ).all()
+        if not rows:
+            break
+        last_id = rows[-1].id
+
+        # First message of the batch for every (session_id, fingerprint)
+        first_rows: Dict[Tuple[int, int], Row] = {}
+        duplicates: List[Row] = []
+        for row in rows:
+            key = (
+                row.session_id,
+                message_fingerprint(
+                    row.session_id,
+                    row.timestamp,
+                    row.sender,
+                    row.content,
+                    row.occurrence,
+                ),
+            )
+            if key in first_rows:
+                duplicates.append(row)
+            else:
+                first_rows[key] = row
+
+        # Fingerprints an earlier batch or a newer upload already stored
+        taken = set(
+            session.exec(
+                select(ParsedMessage.session_id, ParsedMessage.fingerprint).where(
+                    tuple_(ParsedMessage.session_id, ParsedMessage.fingerprint).in_(
+                        list(first_rows)
+                    )
+                )
+            ).all()
+        )
+
+        updates = []
+        for key, row in first_rows.items():
+            if key in taken:
+                duplicates.append(row)
+            else:
+                updates.append({"message_id": row.id, "message_fingerprint": key[1]})
+
+        if duplicates:
+            session.exec(
+                delete(ParsedMessage).where(
+                    ParsedMessage.id.in_([row.id for row in duplicates])
+                )
+            )
+            _recount_sessions(session, duplicates)
+        if updates:
+            session.execute(set_fingerprint, updates)
+        session.commit()
+
+        fingerprinted += len(updates)
+        removed += len(duplicates)
+        print(
+            f"up to message {last_id}: {fingerprinted} fingerprinted, {removed} removed"
+        )
+
+    return fingerprinted, removed
+
+
+def _recount_sessions(session: Session, removed: List[Row]) -> None:
+    """Recount the sessions the removed messages belonged to.
+
+    Only the days from the first to the last removed message of a session
+    are recounted. Runs in the transaction of the delete, so the totals never
+    disagree with the messages.
+    """
+    days: Dict[int, Tuple[datetime, datetime]] = {}
+    for row in removed:
+        first, last = days.get(row.session_id, (row.timestamp, row.timestamp))
+        days[row.session_id] = (min(first, row.timestamp), max(last, row.timestamp))
+
+    message_count = (
+        select(func.count(ParsedMessage.id))
+        .where(ParsedMessage.session_id == ChatSession.id)
+        .scalar_subquery()
+    )
+    session.exec(
+        update(ChatSession)
+        .where(ChatSession.id.in_(list(days)))
+        .values(total_messages=message_count)
+    )
+    for session_id, (first, last) in days.items():
+        refresh_session_stats(session, session_id, first, last)
+        invalidate_insights(session, session_id)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--batch-size", type=int, default=CHAT_INGEST_BATCH_SIZE)
+    args = parser.parse_args()
+
+    with Session(engine) as session:
+        fingerprinted, removed = dedupe_messages(session, args.batch_size)
+
+    print(f"done: {fingerprinted} messages fingerprinted, {removed} duplicates removed")
@@ -0,0 +1,46 @@
+"""Recount the daily stats of chat sessions from their messages.
+
+Fills in chatsessionstats for sessions stored before the table existed, or
+for the sessions given with --session. Each session is committed on its
+own, so the command can be stopped and run again at any time.
+
+    python -m after_us.scripts.rebuild_session_stats
+"""
+
+import argparse
+from typing import List, Optional
+from sqlmodel import Session, select
+from ..models.chat import ChatSession
+from ..services.chat_stats import refresh_session_stats
+from ..services.insights_cache import invalidate_insights
+from ..utils.database import engine
+
+
+def rebuild_session_stats(
+    session: Session, session_ids: Optional[List[int]] = None
+) -> int:
+    """Recount the stats of the given chat sessions, or of all of them.
+
+    Returns the number of sessions recounted.
+    """
+    if session_ids is None:
+        session_ids = session.exec(select(ChatSession.id).order_by(ChatSession.id)).all()
+
+    for session_id in session_ids:
+        refresh_session_stats(session, session_id)
+        invalidate_insights(session, session_id)
+        session.commit()
+        print(f"session {session_id} recounted")
+
+    return len(session_ids)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--session", type=int, action="append", dest="session_ids")
+    args = parser.parse_args()
+
+    with Session(engine) as session:
+        recounted = rebuild_session_stats(session, args.session_ids)
+
+    print(f"done: {recounted} sessions recounted")
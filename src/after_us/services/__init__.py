@@ -1,3 +1,58 @@
 from .healing_service import *
+from .chat_parser import *
+from .bulk_insert import *
+from .chat_archive import *
+from .chat_ingest import *
+from .ingestion_jobs import *
+from .chat_purge import *
+from .chat_search import *
+from .chat_stats import *
+from .lexicon import *
+from .insights import *
+from .insights_cache import *
+from .ai_backend import *
+from .context_index import *
 
-__all__ = ["create_default_closure_activities"]
+__all__ = [
+    "create_default_closure_activities",
+    "ChatFormat",
+    "WhatsAppParser",
+    "detect_chat_format",
+    "iter_text_blocks",
+    "iter_parsed_blocks",
+    "parse_whatsapp_export",
+    "bulk_insert_messages",
+    "message_fingerprint",
+    "open_chat_export",
+    "ingest_blocks",
+    "ingest_export",
+    "discard_chat_session",
+    "IngestionWorkerPool",
+    "run_ingestion_job",
+    "spool_upload",
+    "create_spool_file",
+    "mark_chat_session_deleting",
+    "purge_chat_session",
+    "resume_chat_purges",
+    "run_maintenance",
+    "expire_chunked_uploads",
+    "search_messages",
+    "refresh_session_stats",
+    "Lexicon",
+    "message_sentiment",
+    "InsightCounts",
+    "InsightPartial",
+    "build_chat_insights",
+    "build_combined_insights",
+    "compute_chat_patterns",
+    "InsightsCache",
+    "invalidate_insights",
+    "AIBackend",
+    "AIBackendError",
+    "RuleBasedBackend",
+    "HTTPChatBackend",
+    "create_ai_backend",
+    "SessionIndex",
+    "ContextIndexCache",
+    "find_context_messages",
+]
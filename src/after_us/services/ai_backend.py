@@ -0,0 +1,271 @@
+import abc
+import asyncio
+import json
+import random
+import re
+from typing import AsyncIterator, Dict, List, Optional, Sequence
+from starlette.datastructures import Secret
+from ..config import (
+    AI_API_KEY,
+    AI_API_URL,
+    AI_BACKEND,
+    AI_CONNECT_TIMEOUT,
+    AI_MAX_CONCURRENCY,
+    AI_MAX_CONNECTIONS,
+    AI_MAX_RETRIES,
+    AI_MODEL,
+    AI_RETRY_BACKOFF,
+    AI_TIMEOUT,
+)
+from ..models.chat import ParsedMessage
+from ..models.healing import AIPersonality
+from .lexicon import RESPONSE_TOPICS
+
+try:
+    import httpx
+except ImportError:  # Only needed by the http backend, see the llm extra
+    httpx = None
+
+# First sentences of a rule-based reply, by personality tone
+TONE_OPENINGS = {
+    "supportive": "Remember that healing takes time, and you're doing great by taking this step. ",
+    "empathetic": "I can feel the emotion in your words, and that's completely valid. ",
+    "challenging": "Let's think about this differently - what would your stronger self do? ",
+}
+
+# Rest of a rule-based reply, by what the message is about
+TOPIC_REPLIES = {
+    "sadness": "It's natural to feel this way after a relationship ends. These feelings are part of the healing process.",
+    "anger": "Anger is often a secondary emotion that masks hurt. It's okay to feel angry, but let's explore what's underneath.",
+    "longing": "Missing someone shows how much they meant to you. This feeling will soften with time.",
+    "future": "Looking forward is a positive sign. You're already on the path to healing and growth.",
+}
+DEFAULT_REPLY = "Thank you for sharing that with me. Your feelings are valid and important."
+
+# Response statuses worth trying again after a pause
+RETRY_STATUSES = {408, 429, 500, 502, 503, 504}
+
+
+class AIBackendError(Exception):
+    """The AI service could not produce a reply."""
+
+
+class AIBackend(abc.ABC):
+    """Writes the AI companion's replies to a user's message."""
+
+    @abc.abstractmethod
+    async def generate(
+        self,
+        message: str,
+        personality: Optional[AIPersonality] = None,
+        context_messages: Optional[Sequence[ParsedMessage]] = None,
+    ) -> str:
+        """Generate a reply based on the user's message and context."""
+
+    async def stream(
+        self,
+        message: str,
+        personality: Optional[AIPersonality] = None,
+        context_messages: Optional[Sequence[ParsedMessage]] = None,
+    ) -> AsyncIterator[str]:
+        """Generate a reply piece by piece, as the backend produces it.
+
+        Closing the iterator early stops the generation.
+        """
+        yield await self.generate(message, personality, context_messages)
+
+    async def aclose(self) -> None:
+        """Release the connections held by the backend."""
+
+
+class RuleBasedBackend(AIBackend):
+    """Canned replies picked by keyword, needs no model service."""
+
+    async def generate(
+        self,
+        message: str,
+        personality: Optional[AIPersonality] = None,
+        context_messages: Optional[Sequence[ParsedMessage]] = None,
+    ) -> str:
+        reply = "I understand how you're feeling. "
+        if personality:
+            reply += TONE_OPENINGS.get(personality.tone, "")
+        return reply + TOPIC_REPLIES.get(RESPONSE_TOPICS.first(message), DEFAULT_REPLY)
+
+    async def stream(
+        self,
+        message: str,
+        personality: Optional[AIPersonality] = None,
+        context_messages: Optional[Sequence[ParsedMessage]] = None,
+    ) -> AsyncIterator[str]:
+        reply = await self.generate(message, personality, context_messages)
+        for word in re.findall(r"\S+\s*", reply):
+            yield word
+
+
+class HTTPChatBackend(AIBackend):
+    """Replies from a model served behind an OpenAI-compatible chat API.
+
+    All replies share one client, so connections to the service are pooled
+    and kept alive between requests. At most max_concurrency replies are
+    generated at once and the others wait for a slot. Connection errors,
+    timeouts and overloaded responses are retried up to max_retries times,
+    after an exponential backoff with full jitter.
+    """
+
+    def __init__(
+        self,
+        base_url: str = AI_API_URL,
+        model: str = AI_MODEL,
+        api_key: Optional[Secret] = AI_API_KEY,
+        timeout: float = AI_TIMEOUT,
+        connect_timeout: float = AI_CONNECT_TIMEOUT,
+        max_retries: int = AI_MAX_RETRIES,
+        retry_backoff: float = AI_RETRY_BACKOFF,
+        max_concurrency: int = AI_MAX_CONCURRENCY,
+        max_connections: int = AI_MAX_CONNECTIONS,
+    ):
+        if httpx is None:
+            raise RuntimeError("The http AI backend needs httpx, install after-us[llm]")
+
+        self.model = model
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+        self._slots = asyncio.Semaphore(max_concurrency)
+        headers = {"Authorization": f"Bearer {api_key}"} if api_key else {}
+        self._client = httpx.AsyncClient(
+            base_url=base_url,
+            headers=headers,
+            timeout=httpx.Timeout(timeout, connect=connect_timeout),
+            limits=httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=max_connections,
+            ),
+        )
+
+    async def generate(
+        self,
+        message: str,
+        personality: Optional[AIPersonality] = None,
+        context_messages: Optional[Sequence[ParsedMessage]] = None,
+    ) -> str:
+        payload = {
+            "model": self.model,
+            "messages": build_prompt(message, personality, context_messages),
+        }
+        async with self._slots:
+            response = await self._send("/chat/completions", payload)
+            try:
+                return response.json()["choices"][0]["message"]["content"]
+            except (ValueError, KeyError, IndexError, TypeError) as e:
+                raise AIBackendError("Unexpected reply from the AI service") from e
+
+    async def stream(
+        self,
+        message: str,
+        personality: Optional[AIPersonality] = None,
+        context_messages: Optional[Sequence[ParsedMessage]] = None,
+    ) -> AsyncIterator[str]:
+        """Stream the reply's tokens from the service's server-sent events.
+
+        The concurrency slot and the connection are held until the reply is
+        complete or the iterator is closed, whichever comes first.
+        """
+        payload = {
+            "model": self.model,
+            "messages": build_prompt(message, personality, context_messages),
+            "stream": True,
+        }
+        async with self._slots:
+            response = await self._send("/chat/completions", payload, stream=True)
+            try:
+                async for line in response.aiter_lines():
+                    if not line.startswith("data:"):
+                        continue
+                    data = line[len("data:") :].strip()
+                    if data == "[DONE]":
+                        return
+                    try:
+                        token = json.loads(data)["choices"][0]["delta"].get("content")
+                    except (ValueError, KeyError, IndexError, TypeError) as e:
+                        raise AIBackendError(
+                            "Unexpected reply from the AI service"
+                        ) from e
+                    if token:
+                        yield token
+            except httpx.TransportError as e:
+                raise AIBackendError("AI service connection lost") from e
+            finally:
+                await response.aclose()
+
+    async def aclose(self) -> None:
+        await self._client.aclose()
+
+    async def _send(
+        self, path: str, payload: dict, stream: bool = False
+    ) -> "httpx.Response":
+        """POST payload to the service, retrying transient failures.
+
+        With stream the body is left unread, so a reply is never retried
+        once its tokens started to arrive, and the caller must close the
+        response.
+        """
+        for attempt in range(self.max_retries + 1):
+            request = self._client.build_request("POST", path, json=payload)
+            try:
+                response = await self._client.send(request, stream=stream)
+            except httpx.TransportError as e:
+                error: Exception = e
+            else:
+                if response.status_code not in RETRY_STATUSES:
+                    if response.is_success:
+                        return response
+                    await response.aclose()
+                    raise AIBackendError(
+                        f"AI service request failed with {response.status_code}"
+                    )
+                await response.aclose()
+                error = AIBackendError(f"AI service answered {response.status_code}")
+
+            if attempt < self.max_retries:
+                await asyncio.sleep(random.uniform(0, self.retry_backoff * 2**attempt))
+
+        raise AIBackendError("AI service unavailable") from error
+
+
+def build_prompt(
+    message: str,
+    personality: Optional[AIPersonality] = None,
+    context_messages: Optional[Sequence[ParsedMessage]] = None,
+) -> List[Dict[str, str]]:
+    """Build the chat messages sent to the model for a user's message."""
+    instructions = (
+        "You are a caring companion helping the user heal after a breakup. "
+        "Answer briefly and warmly."
+    )
+    if personality:
+        instructions += f" Your tone is {personality.tone} and {personality.mood}."
+        if personality.relationship_context:
+            instructions += (
+                f" About the relationship: {personality.relationship_context}"
+            )
+    if context_messages:
+        excerpt = "\n".join(
+            f"[{m.timestamp:%Y-%m-%d %H:%M}] {m.sender}: {m.content}"
+            for m in context_messages
+        )
+        instructions += f"\n\nMessages from their chat history:\n{excerpt}"
+
+    return [
+        {"role": "system", "content": instructions},
+        {"role": "user", "content": message},
+    ]
+
+
+def create_ai_backend(name: str = AI_BACKEND) -> AIBackend:
+    """Create the AI backend configured with AI_BACKEND."""
+    if name == "rules":
+        return RuleBasedBackend()
+    if name == "http":
+        return HTTPChatBackend()
+    raise ValueError(f"Unknown AI backend {name!r}, expected 'rules' or 'http'")
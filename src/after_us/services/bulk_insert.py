@@ -0,0 +1,164 @@
+import hashlib
+from datetime import datetime
+from typing import Iterable, List, Sequence
+from sqlalchemy import insert
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlmodel import Session
+from ..config import CHAT_INGEST_USE_COPY
+from ..models.chat import ParsedMessage
+from .lexicon import THEMES, message_sentiment
+
+# Columns written for every parsed message, in COPY order
+MESSAGE_COLUMNS = (
+    "session_id",
+    "timestamp",
+    "sender",
+    "content",
+    "is_user",
+    "fingerprint",
+    "sentiment",
+    "themes",
+)
+
+# Unique index that duplicate messages conflict on
+FINGERPRINT_INDEX_COLUMNS = ["session_id", "fingerprint"]
+
+# Dialects whose INSERT supports ON CONFLICT DO NOTHING
+ON_CONFLICT_INSERTS = {"postgresql": postgresql.insert, "sqlite": sqlite.insert}
+
+# Temporary table COPY writes to before rows are merged into parsedmessage
+STAGING_TABLE = f"{ParsedMessage.__tablename__}_staging"
+
+
+def message_fingerprint(
+    session_id: int,
+    timestamp: datetime,
+    sender: str,
+    content: str,
+    occurrence: int = 0,
+) -> int:
+    """64-bit hash identifying a message within its chat session.
+
+    Timestamps only have minute resolution, so a sender can send the same
+    text several times at one timestamp; occurrence numbers these repeats
+    from 0 in export order, so each of them is stored. The first occurrence
+    hashes as fingerprints always did. Returned as a signed integer so it
+    fits a BIGINT column.
+    """
+    key = f"{session_id}\x1f{timestamp.isoformat()}\x1f{sender}\x1f{content}"
+    if occurrence:
+        key += f"\x1f{occurrence}"
+    digest = hashlib.blake2b(key.encode(), digest_size=8).digest()
+    return int.from_bytes(digest, "big", signed=True)
+
+
+def set_fingerprints(rows: Iterable[dict]) -> None:
+    """Fill in the fingerprint of message rows that don't have one yet.
+
+    Rows may carry the occurrence of a repeated message, see
+    message_fingerprint.
+    """
+    for row in rows:
+        if row.get("fingerprint") is None:
+            row["fingerprint"] = message_fingerprint(
+                row["session_id"],
+                row["timestamp"],
+                row["sender"],
+                row["content"],
+                row.get("occurrence", 0),
+            )
+
+
+def classify_messages(rows: Iterable[dict]) -> None:
+    """Fill in the sentiment and themes of message rows that don't have them yet."""
+    for row in rows:
+        if row.get("sentiment") is None:
+            row["sentiment"] = message_sentiment(row["content"])
+        if row.get("themes") is None:
+            row["themes"] = THEMES.mask(row["content"])
+
+
+def supports_copy(session: Session) -> bool:
+    """Check whether the session is bound to Postgres through psycopg 3."""
+    dialect = session.get_bind().dialect
+    return dialect.name == "postgresql" and dialect.driver == "psycopg"
+
+
+def copy_messages(session: Session, rows: Sequence[dict]) -> int:
+    """Insert message rows with Postgres COPY FROM STDIN.
+
+    COPY can't skip conflicting rows, so the rows are copied into a
+    temporary staging table and moved over with INSERT ... ON CONFLICT DO
+    NOTHING. Runs on the session's own connection, so the rows are part of
+    the current transaction and are committed together with it. Returns the
+    number of rows that were not duplicates.
+    """
+    columns = ", ".join(MESSAGE_COLUMNS)
+    table = ParsedMessage.__tablename__
+    conflict_columns = ", ".join(FINGERPRINT_INDEX_COLUMNS)
+    driver_connection = session.connection().connection.driver_connection
+
+    with driver_connection.cursor() as cursor:
+        cursor.execute(
+            f"CREATE TEMP TABLE IF NOT EXISTS {STAGING_TABLE} ON COMMIT DROP AS "
+            f"SELECT {columns} FROM {table} WITH NO DATA"
+        )
+        with cursor.copy(f"COPY {STAGING_TABLE} ({columns}) FROM STDIN") as copy:
+            for row in rows:
+                copy.write_row([row[column] for column in MESSAGE_COLUMNS])
+
+        cursor.execute(
+            f"INSERT INTO {table} ({columns}) SELECT {columns} FROM {STAGING_TABLE} "
+            f"ON CONFLICT ({conflict_columns}) DO NOTHING"
+        )
+        inserted = cursor.rowcount
+        cursor.execute(f"TRUNCATE {STAGING_TABLE}")
+
+    return inserted
+
+
+def insert_messages(session: Session, rows: Sequence[dict]) -> int:
+    """Insert message rows with a single executemany INSERT.
+
+    Duplicates are skipped with ON CONFLICT DO NOTHING where the dialect
+    supports it. Returns the number of rows inserted.
+    """
+    values = [{column: row[column] for column in MESSAGE_COLUMNS} for row in rows]
+    dialect_insert = ON_CONFLICT_INSERTS.get(session.get_bind().dialect.name)
+
+    if dialect_insert is None:
+        session.execute(insert(ParsedMessage.__table__), values)
+        return len(values)
+
+    statement = (
+        dialect_insert(ParsedMessage.__table__)
+        .on_conflict_do_nothing(index_elements=FINGERPRINT_INDEX_COLUMNS)
+        .returning(ParsedMessage.__table__.c.id)
+    )
+    return len(session.execute(statement, values).all())
+
+
+def bulk_insert_messages(
+    session: Session,
+    rows: Iterable[dict],
+    use_copy: bool = CHAT_INGEST_USE_COPY,
+) -> int:
+    """Insert parsed message rows without building ORM objects.
+
+    Each row is a dict with the keys in MESSAGE_COLUMNS, the fingerprint,
+    sentiment and themes are computed when they are missing. Rows whose
+    fingerprint is already stored for the session are skipped. Uses COPY
+    when the database supports it and falls back to executemany otherwise.
+    The caller owns the transaction. Returns the number of rows written.
+    """
+    rows: List[dict] = list(rows)
+    if not rows:
+        return 0
+
+    set_fingerprints(rows)
+    classify_messages(rows)
+
+    if use_copy and supports_copy(session):
+        return copy_messages(session, rows)
+
+    return insert_messages(session, rows)
@@ -0,0 +1,65 @@
+import zipfile
+from contextlib import contextmanager
+from typing import BinaryIO, Callable, Iterator, Optional
+
+# File extensions accepted by the upload endpoint
+SUPPORTED_EXPORT_EXTENSIONS = (".txt", ".zip")
+
+# iOS names the chat text "_chat.txt", Android "WhatsApp Chat with <name>.txt"
+IOS_CHAT_MEMBER = "_chat.txt"
+
+# Called with the open archive and each media entry, nothing is extracted
+MediaHandler = Callable[[zipfile.ZipFile, zipfile.ZipInfo], None]
+
+
+def is_supported_export(filename: str) -> bool:
+    """Check whether an uploaded file name looks like a WhatsApp export."""
+    return filename.lower().endswith(SUPPORTED_EXPORT_EXTENSIONS)
+
+
+def find_chat_member(archive: zipfile.ZipFile) -> zipfile.ZipInfo:
+    """Find the chat text inside a WhatsApp export archive."""
+    candidates = [
+        info
+        for info in archive.infolist()
+        if not info.is_dir()
+        and info.filename.lower().endswith(".txt")
+        and not info.filename.startswith("__MACOSX/")
+    ]
+
+    for info in candidates:
+        if info.filename.rsplit("/", 1)[-1] == IOS_CHAT_MEMBER:
+            return info
+    if candidates:
+        return candidates[0]
+
+    raise ValueError("No chat text file found in the archive")
+
+
+@contextmanager
+def open_chat_export(
+    path: str, media_handler: Optional[MediaHandler] = None
+) -> Iterator[BinaryIO]:
+    """Open a spooled export as a binary stream of chat text.
+
+    Plain text exports are opened as they are. For zip archives the chat
+    text entry is decompressed on the fly as the stream is read, so the
+    archive is never extracted. Every other entry is media: it is passed to
+    media_handler if one is given and skipped otherwise.
+    """
+    if not zipfile.is_zipfile(path):
+        with open(path, "rb") as stream:
+            yield stream
+        return
+
+    with zipfile.ZipFile(path) as archive:
+        chat_member = find_chat_member(archive)
+
+        if media_handler is not None:
+            for info in archive.infolist():
+                if info.is_dir() or info.filename == chat_member.filename:
+                    continue
+                media_handler(archive, info)
+
+        with archive.open(chat_member) as stream:
+            yield stream
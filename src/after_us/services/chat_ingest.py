@@ -0,0 +1,243 @@
+import hashlib
+import json
+from collections import Counter
+from concurrent.futures import Executor
+from dataclasses import dataclass
+from datetime import datetime
+from typing import BinaryIO, Callable, Iterable, List, Optional
+from sqlmodel import Session, delete
+from ..config import CHAT_INGEST_BATCH_SIZE
+from ..models.chat import ChatSession
+from .bulk_insert import bulk_insert_messages
+from .chat_parser import (
+    ParsedBlock,
+    ParsedMessage,
+    iter_parsed_blocks,
+    iter_text_blocks,
+    skip_lines,
+)
+from .chat_stats import refresh_session_stats
+from .insights_cache import invalidate_insights
+
+
+@dataclass
+class IngestProgress:
+    """Running totals of an ingest, as of the last committed block."""
+
+    lines_read: int = 0
+    messages_stored: int = 0
+    failed_lines: int = 0
+
+
+def message_hash(sender: str, content: str) -> str:
+    """Short hash telling apart messages that share a timestamp."""
+    return hashlib.blake2b(f"{sender}\x1f{content}".encode(), digest_size=6).hexdigest()
+
+
+class HighWaterMark:
+    """The newest timestamp stored for a chat session and what is stored at it.
+
+    Exports are chronological, so everything a re-export holds before the
+    mark is already stored. Messages at the mark itself are matched by their
+    content hash, which lets through new messages sent in the same minute as
+    the last stored one.
+    """
+
+    def __init__(
+        self, timestamp: Optional[datetime] = None, hashes: Iterable[str] = ()
+    ):
+        self.timestamp = timestamp
+        self.hashes = Counter(hashes)
+
+    @classmethod
+    def from_session(cls, chat_session: ChatSession) -> "HighWaterMark":
+        return cls(
+            chat_session.last_message_at,
+            json.loads(chat_session.boundary_hashes or "[]"),
+        )
+
+    def save(self, chat_session: ChatSession) -> None:
+        chat_session.last_message_at = self.timestamp
+        chat_session.boundary_hashes = json.dumps(sorted(self.hashes.elements()))
+
+    def add(self, message: ParsedMessage) -> int:
+        """Move the mark past one newly stored message.
+
+        Returns how many messages with the same sender and content were
+        stored before it at its timestamp, which tells apart a message sent
+        twice in the same minute. Exports are chronological, a message from
+        before the mark counts as the first.
+        """
+        timestamp, sender, content, _ = message
+        if self.timestamp is None or timestamp > self.timestamp:
+            self.timestamp = timestamp
+            self.hashes = Counter()
+        if timestamp != self.timestamp:
+            return 0
+
+        digest = message_hash(sender, content)
+        self.hashes[digest] += 1
+        return self.hashes[digest] - 1
+
+    def skip_stored(self, messages: List[ParsedMessage]) -> List[ParsedMessage]:
+        """Drop the messages of a block that are already stored.
+
+        Each boundary hash is consumed as it is matched, so the mark must be
+        a snapshot taken before the ingest started.
+        """
+        mark = self.timestamp
+        if mark is None or not messages or messages[0][0] > mark:
+            return messages
+        if messages[-1][0] < mark:
+            return []
+
+        new_messages = []
+        for message in messages:
+            timestamp, sender, content, _ = message
+            if timestamp < mark:
+                continue
+            if timestamp == mark:
+                digest = message_hash(sender, content)
+                if self.hashes[digest]:
+                    self.hashes[digest] -= 1
+                    continue
+            new_messages.append(message)
+        return new_messages
+
+
+def ingest_blocks(
+    session: Session,
+    chat_session: ChatSession,
+    parsed_blocks: Iterable[ParsedBlock],
+    batch_size: int = CHAT_INGEST_BATCH_SIZE,
+    progress: Optional[IngestProgress] = None,
+    on_progress: Optional[Callable[[IngestProgress], None]] = None,
+    skip_stored: bool = False,
+) -> IngestProgress:
+    """Store parsed blocks of messages for a chat session.
+
+    Rows are inserted in batches of batch_size and each block is committed
+    in its own transaction together with the session totals, daily stats and
+    high-water mark, and drops the session's cached reports. on_progress is
+    called right before every commit, so anything it adds to the session is
+    committed atomically with the block. Only one block is held in memory at
+    a time. With skip_stored, messages up to the session's high-water mark
+    are left out so that only the delta of a re-export is stored.
+    """
+    progress = progress or IngestProgress()
+    session_id = chat_session.id
+    participants = set(json.loads(chat_session.participants or "[]"))
+    mark = HighWaterMark.from_session(chat_session)
+    stored_mark = HighWaterMark.from_session(chat_session) if skip_stored else None
+
+    for parsed in parsed_blocks:
+        stored = 0
+        batch: List[dict] = []
+        messages = parsed.messages
+        if stored_mark is not None:
+            messages = stored_mark.skip_stored(messages)
+
+        for message in messages:
+            timestamp, sender, content, is_user = message
+            participants.add(sender)
+            batch.append(
+                {
+                    "session_id": session_id,
+                    "timestamp": timestamp,
+                    "sender": sender,
+                    "content": content,
+                    "is_user": is_user,
+                    # Continues from the committed mark, so a repeat is
+                    # numbered the same when a job resumes or an append
+                    # re-reads the stored minute
+                    "occurrence": mark.add(message),
+                }
+            )
+
+            if len(batch) >= batch_size:
+                stored += bulk_insert_messages(session, batch)
+                batch.clear()
+
+        if batch:
+            stored += bulk_insert_messages(session, batch)
+
+        if stored:
+            # Recount the days the block touched, duplicates were not stored
+            timestamps = [message[0] for message in messages]
+            refresh_session_stats(
+                session, session_id, min(timestamps), max(timestamps)
+            )
+            invalidate_insights(session, session_id)
+
+        progress.lines_read += parsed.lines
+        progress.messages_stored += stored
+        progress.failed_lines += parsed.failed
+
+        # Keep the session totals in step with what is committed
+        mark.save(chat_session)
+        chat_session.total_messages += stored
+        chat_session.participants = json.dumps(sorted(participants))
+        session.add(chat_session)
+        if on_progress is not None:
+            on_progress(progress)
+        session.commit()
+
+    return progress
+
+
+def ingest_export(
+    session: Session,
+    chat_session: ChatSession,
+    stream: BinaryIO,
+    user_name: str,
+    executor: Optional[Executor] = None,
+    progress: Optional[IngestProgress] = None,
+    on_progress: Optional[Callable[[IngestProgress], None]] = None,
+    should_stop: Optional[Callable[[], bool]] = None,
+    skip_stored: bool = False,
+) -> IngestProgress:
+    """Decode, parse and store a WhatsApp export read from a binary stream.
+
+    Large exports are parsed on the executor when one is given. When resuming
+    from an earlier progress, the lines it already read are skipped. If
+    should_stop returns True the ingest stops after the current block. With
+    skip_stored only messages newer than what the session holds are stored.
+    """
+    progress = progress or IngestProgress()
+    blocks = skip_lines(iter_text_blocks(stream), progress.lines_read)
+    parsed_blocks = iter_parsed_blocks(blocks, user_name, executor)
+
+    if should_stop is not None:
+        parsed_blocks = _until(parsed_blocks, should_stop)
+
+    ingest_blocks(
+        session,
+        chat_session,
+        parsed_blocks,
+        progress=progress,
+        on_progress=on_progress,
+        skip_stored=skip_stored,
+    )
+    session.refresh(chat_session)
+    return progress
+
+
+def _until(
+    parsed_blocks: Iterable[ParsedBlock], should_stop: Callable[[], bool]
+) -> Iterable[ParsedBlock]:
+    """Yield parsed blocks until should_stop returns True."""
+    for parsed in parsed_blocks:
+        yield parsed
+        if should_stop():
+            return
+
+
+def discard_chat_session(session: Session, session_id: int) -> None:
+    """Remove a chat session and any messages already stored for it.
+
+    The messages go with the session through ON DELETE CASCADE, in the same
+    statement.
+    """
+    session.rollback()
+    session.exec(delete(ChatSession).where(ChatSession.id == session_id))
+    session.commit()
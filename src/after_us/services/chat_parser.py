@@ -0,0 +1,154 @@
+import codecs
+from collections import deque
+from concurrent.futures import Executor, Future
+from dataclasses import replace
+from itertools import chain, islice
+from typing import BinaryIO, Deque, Iterable, Iterator, List, Optional
+
+from ..chat_format import (
+    FORMAT_SAMPLE_LINES,
+    ParsedBlock,
+    ParsedMessage,
+    WhatsAppParser,
+    count_lines,
+    detect_chat_format,
+    detect_day_first,
+    parse_block,
+)
+from ..config import (
+    CHAT_PARSE_PARALLEL_THRESHOLD,
+    CHAT_PARSE_WORKERS,
+    CHAT_UPLOAD_CHUNK_SIZE,
+)
+
+
+def iter_text_blocks(
+    stream: BinaryIO,
+    chunk_size: int = CHAT_UPLOAD_CHUNK_SIZE,
+    encoding: str = "utf-8",
+) -> Iterator[str]:
+    """Decode a binary stream chunk by chunk and yield blocks of whole lines."""
+    decoder = codecs.getincrementaldecoder(encoding)()
+    pending = ""
+
+    while True:
+        chunk = stream.read(chunk_size)
+        if not chunk:
+            break
+
+        text = pending + decoder.decode(chunk)
+        # The text after the last newline may be an incomplete line, keep it
+        # for the next chunk
+        cut = text.rfind("\n") + 1
+        pending = text[cut:]
+        if cut:
+            yield text[:cut]
+
+    pending += decoder.decode(b"", final=True)
+    if pending:
+        yield pending
+
+
+def skip_lines(blocks: Iterable[str], count: int) -> Iterator[str]:
+    """Drop the first count lines from a stream of text blocks."""
+    for block in blocks:
+        if count <= 0:
+            yield block
+            continue
+
+        lines = count_lines(block)
+        if lines <= count:
+            count -= lines
+            continue
+
+        start = 0
+        for _ in range(count):
+            start = block.index("\n", start) + 1
+        count = 0
+        yield block[start:]
+
+
+def split_text_blocks(content: str, block_size: int) -> Iterator[str]:
+    """Split text held in memory into blocks of whole lines."""
+    start = 0
+    while start < len(content):
+        cut = content.find("\n", start + block_size) + 1 or len(content)
+        yield content[start:cut]
+        start = cut
+
+
+def iter_parsed_blocks(
+    blocks: Iterable[str],
+    user_name: str,
+    executor: Optional[Executor] = None,
+    parallel_threshold: int = CHAT_PARSE_PARALLEL_THRESHOLD,
+    max_pending: int = max(CHAT_PARSE_WORKERS, 1) * 2,
+) -> Iterator[ParsedBlock]:
+    """Parse blocks of export lines, yielding one ParsedBlock per block.
+
+    The layout is detected from the first block. When no date there tells
+    dd/mm from mm/dd, blocks are read ahead and held until one does, or the
+    input ends and dd/mm is assumed. Blocks are parsed inline until
+    parallel_threshold characters have been read; after that, if an
+    executor is given, they are fanned out to it with at most max_pending
+    blocks in flight. Results are always yielded in input order.
+    """
+    blocks = iter(blocks)
+    first = next(blocks, None)
+    if first is None:
+        return
+
+    chat_format = detect_chat_format(islice(first.split("\n"), FORMAT_SAMPLE_LINES))
+    if chat_format is None:
+        return
+
+    head = [first]
+    day_first = detect_day_first(first.split("\n"))
+    while day_first is None:
+        block = next(blocks, None)
+        if block is None:
+            break
+        head.append(block)
+        day_first = detect_day_first(block.split("\n"))
+    if day_first is not None:
+        chat_format = replace(chat_format, day_first=day_first)
+
+    parser = WhatsAppParser(chat_format, user_name)
+    pending: Deque[Future] = deque()
+    seen = 0
+
+    for block in chain(head, blocks):
+        seen += len(block)
+        if executor is None or seen <= parallel_threshold:
+            # Small inputs never pay for the round trip to another process
+            failed = parser.failed_lines
+            messages = list(parser.parse_lines(block.split("\n")))
+            yield ParsedBlock(
+                count_lines(block), messages, parser.failed_lines - failed
+            )
+            continue
+
+        pending.append(executor.submit(parse_block, block, chat_format, user_name))
+        if len(pending) >= max_pending:
+            yield pending.popleft().result()
+
+    while pending:
+        yield pending.popleft().result()
+
+
+def parse_whatsapp_export(
+    content: str,
+    user_name: str,
+    executor: Optional[Executor] = None,
+    parallel_threshold: int = CHAT_PARSE_PARALLEL_THRESHOLD,
+) -> List[ParsedMessage]:
+    """Parse a whole WhatsApp export held in memory.
+
+    With an executor, the part of the export past parallel_threshold is split
+    at line boundaries and parsed in parallel.
+    """
+    messages: List[ParsedMessage] = []
+    blocks = split_text_blocks(content, CHAT_UPLOAD_CHUNK_SIZE)
+    for parsed in iter_parsed_blocks(blocks, user_name, executor, parallel_threshold):
+        messages.extend(parsed.messages)
+    return messages
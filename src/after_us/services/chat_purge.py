@@ -0,0 +1,79 @@
+import logging
+import threading
+from sqlmodel import Session, delete, select, update
+from ..config import CHAT_DELETE_BATCH_SIZE, CHAT_UPLOAD_SWEEP_INTERVAL
+from ..models.chat import ChatSession, ParsedMessage
+from ..utils.database import engine
+from .ingestion_jobs import expire_chunked_uploads
+
+logger = logging.getLogger(__name__)
+
+
+def mark_chat_session_deleting(session: Session, session_id: int) -> None:
+    """Hide a chat session until purge_chat_session has removed it."""
+    session.exec(
+        update(ChatSession).where(ChatSession.id == session_id).values(deleting=True)
+    )
+    session.commit()
+
+
+def purge_chat_session(
+    session_id: int, batch_size: int = CHAT_DELETE_BATCH_SIZE
+) -> None:
+    """Delete a chat session's messages in batches, then the session itself.
+
+    Each batch is its own short transaction, so a large session never holds
+    locks for long and a purge cut off by a restart continues where it left
+    off.
+    """
+    with Session(engine) as session:
+        while True:
+            batch = (
+                select(ParsedMessage.id)
+                .where(ParsedMessage.session_id == session_id)
+                .limit(batch_size)
+            )
+            result = session.exec(
+                delete(ParsedMessage).where(ParsedMessage.id.in_(batch))
+            )
+            session.commit()
+            if result.rowcount < batch_size:
+                break
+
+        session.exec(delete(ChatSession).where(ChatSession.id == session_id))
+        session.commit()
+
+
+def resume_chat_purges() -> None:
+    """Finish purging the chat sessions left marked as deleting."""
+    with Session(engine) as session:
+        session_ids = session.exec(
+            select(ChatSession.id).where(ChatSession.deleting.is_(True))
+        ).all()
+
+    for session_id in session_ids:
+        try:
+            purge_chat_session(session_id)
+        except Exception:
+            logger.exception("Purging chat session %s failed", session_id)
+
+
+def run_maintenance(
+    stop: threading.Event, interval: int = CHAT_UPLOAD_SWEEP_INTERVAL
+) -> None:
+    """Finish interrupted purges, then drop abandoned uploads until stopped.
+
+    Meant to run on a background thread for the lifetime of the app.
+    """
+    resume_chat_purges()
+
+    while True:
+        try:
+            expired = expire_chunked_uploads()
+            if expired:
+                logger.info("Dropped %s abandoned chunked uploads", expired)
+        except Exception:
+            logger.exception("Expiring chunked uploads failed")
+
+        if stop.wait(interval):
+            return
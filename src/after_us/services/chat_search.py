@@ -0,0 +1,76 @@
+from datetime import datetime
+from typing import List, Optional, Tuple
+from sqlalchemy import Float, cast, func, literal, tuple_
+from sqlalchemy.dialects.postgresql import REGCONFIG
+from sqlmodel import Session, select
+from ..models.chat import SEARCH_CONFIG, ChatSession, ParsedMessage
+
+# Marks placed around matching words in a highlight
+HIGHLIGHT_START = "<mark>"
+HIGHLIGHT_STOP = "</mark>"
+HIGHLIGHT_OPTIONS = (
+    f"StartSel={HIGHLIGHT_START}, StopSel={HIGHLIGHT_STOP}, "
+    "MaxWords=35, MinWords=15, MaxFragments=3"
+)
+
+
+def search_messages(
+    session: Session,
+    user_id: int,
+    query: str,
+    limit: int,
+    session_id: Optional[int] = None,
+    sender: Optional[str] = None,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    after: Optional[Tuple[float, int]] = None,
+) -> List:
+    """Find a user's messages matching a web-search style query.
+
+    Rows hold the message columns plus its rank and highlighted content, best
+    match first and then newest id first. after is the (rank, id) of the last
+    row of the previous page. The rank is read as double precision, so it
+    survives a round trip through a cursor and compares equal again.
+    """
+    search_vector = ParsedMessage.__table__.c.search_vector
+    config = literal(SEARCH_CONFIG, REGCONFIG)
+    ts_query = func.websearch_to_tsquery(config, query)
+    rank = cast(func.ts_rank(search_vector, ts_query), Float(precision=53))
+
+    statement = (
+        select(
+            ParsedMessage.id,
+            ParsedMessage.session_id,
+            ParsedMessage.timestamp,
+            ParsedMessage.sender,
+            ParsedMessage.content,
+            ParsedMessage.is_user,
+            rank.label("rank"),
+            func.ts_headline(
+                config,
+                ParsedMessage.content,
+                ts_query,
+                literal(HIGHLIGHT_OPTIONS),
+            ).label("highlight"),
+        )
+        .join(ChatSession, ChatSession.id == ParsedMessage.session_id)
+        .where(
+            ChatSession.user_id == user_id,
+            ChatSession.deleting.is_(False),
+            search_vector.op("@@")(ts_query),
+        )
+    )
+
+    if session_id is not None:
+        statement = statement.where(ParsedMessage.session_id == session_id)
+    if sender is not None:
+        statement = statement.where(ParsedMessage.sender == sender)
+    if start is not None:
+        statement = statement.where(ParsedMessage.timestamp >= start)
+    if end is not None:
+        statement = statement.where(ParsedMessage.timestamp < end)
+    if after is not None:
+        statement = statement.where(tuple_(rank, ParsedMessage.id) < after)
+
+    statement = statement.order_by(rank.desc(), ParsedMessage.id.desc()).limit(limit)
+    return list(session.exec(statement).all())
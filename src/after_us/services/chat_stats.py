@@ -0,0 +1,73 @@
+from datetime import date, datetime, time, timedelta
+from typing import Optional
+from sqlalchemy import Date, cast, func, insert
+from sqlmodel import Session, delete, select
+from ..models.chat import ChatSessionStats, ParsedMessage
+
+
+def refresh_session_stats(
+    session: Session,
+    session_id: int,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+) -> None:
+    """Recount the daily stats of a chat session from its stored messages.
+
+    Only the days from start to end, both inclusive, are recounted, so after
+    storing a block of messages this reads just the days the block touched.
+    Without a range the whole session is recounted. Sentiment and themes are
+    summed from the columns classified at ingest, so no text is read. The
+    caller owns the transaction.
+    """
+    day = cast(ParsedMessage.timestamp, Date)
+    in_range = [ParsedMessage.session_id == session_id]
+    stale = [ChatSessionStats.session_id == session_id]
+
+    if start is not None:
+        first_day = start.date()
+        in_range.append(ParsedMessage.timestamp >= _midnight(first_day))
+        stale.append(ChatSessionStats.day >= first_day)
+    if end is not None:
+        last_day = end.date()
+        in_range.append(ParsedMessage.timestamp < _midnight(last_day + timedelta(days=1)))
+        stale.append(ChatSessionStats.day <= last_day)
+
+    counts = (
+        select(
+            ParsedMessage.session_id,
+            day,
+            ParsedMessage.sender,
+            ParsedMessage.is_user,
+            func.count(),
+            func.coalesce(func.sum(func.length(ParsedMessage.content)), 0),
+            func.count().filter(ParsedMessage.sentiment == 1),
+            func.count().filter(ParsedMessage.sentiment == -1),
+            func.coalesce(func.bit_or(ParsedMessage.themes), 0),
+        )
+        .where(*in_range)
+        .group_by(
+            ParsedMessage.session_id, day, ParsedMessage.sender, ParsedMessage.is_user
+        )
+    )
+
+    session.exec(delete(ChatSessionStats).where(*stale))
+    session.exec(
+        insert(ChatSessionStats).from_select(
+            [
+                "session_id",
+                "day",
+                "sender",
+                "is_user",
+                "message_count",
+                "char_count",
+                "positive_count",
+                "negative_count",
+                "themes",
+            ],
+            counts,
+        )
+    )
+
+
+def _midnight(day: date) -> datetime:
+    return datetime.combine(day, time.min)
@@ -0,0 +1,269 @@
+import asyncio
+import heapq
+import math
+import re
+import weakref
+from array import array
+from bisect import bisect_left
+from collections import Counter, OrderedDict
+from typing import Awaitable, Callable, Dict, Iterable, List, Optional, Tuple
+from sqlmodel import Session, select
+from ..config import (
+    CONTEXT_INDEX_CACHE_SIZE,
+    CONTEXT_NEIGHBOURS,
+    CONTEXT_RECENT_MESSAGES,
+    CONTEXT_TOP_K,
+)
+from ..models.chat import ChatSession, ParsedMessage
+from ..utils.database import engine
+
+# Messages fetched per round trip when indexing a session
+INDEX_BATCH_SIZE = 1000
+
+# BM25 term frequency saturation and length normalisation
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+# Query terms found in more than this share of a session's messages, and in
+# more than COMMON_TERM_MIN_MESSAGES of them, are treated as stop words:
+# they barely change the ranking but have the longest postings
+MAX_DOCUMENT_FREQUENCY = 0.1
+COMMON_TERM_MIN_MESSAGES = 100
+
+WORD_PATTERN = re.compile(r"\w+")
+
+
+def tokenize(text: str) -> List[str]:
+    """Split a text into the lowercased words it is indexed under."""
+    return WORD_PATTERN.findall(text.lower())
+
+
+def is_common_term(frequency: int, count: int) -> bool:
+    """Check whether a term in frequency of count messages is a stop word."""
+    return frequency > max(count * MAX_DOCUMENT_FREQUENCY, COMMON_TERM_MIN_MESSAGES)
+
+
+class SessionIndex:
+    """BM25 inverted index over the messages of one chat session.
+
+    Messages are numbered in chronological order, and each term maps to the
+    numbers of the messages it appears in and how often, so a query only
+    reads the postings of its own terms however long the chat is. Postings
+    are kept in compact arrays rather than lists of objects.
+    """
+
+    def __init__(self, messages: Iterable[Tuple[int, str]]):
+        self.message_ids = array("q")
+        self.lengths = array("I")
+        self.postings: Dict[str, Tuple[array, array]] = {}
+        total_length = 0
+
+        for number, (message_id, content) in enumerate(messages):
+            terms = Counter(tokenize(content))
+            length = sum(terms.values())
+            self.message_ids.append(message_id)
+            self.lengths.append(length)
+            total_length += length
+
+            for term, count in terms.items():
+                entry = self.postings.get(term)
+                if entry is None:
+                    entry = self.postings[term] = (array("I"), array("H"))
+                entry[0].append(number)
+                entry[1].append(min(count, 0xFFFF))
+
+        self.average_length = max(total_length / max(len(self.message_ids), 1), 1.0)
+
+    def __len__(self) -> int:
+        return len(self.message_ids)
+
+    def search(self, query: str, limit: int) -> List[int]:
+        """Get the numbers of the messages that best match query, best first.
+
+        Terms are scored from the rarest, which can add the most to a score.
+        Once the terms left could not lift a message that matched none of
+        the earlier ones into the top limit, their postings are only looked
+        up for the messages already matched instead of read in full, so
+        common words cost next to nothing. The result is the same as
+        scoring every message.
+        """
+        count = len(self.message_ids)
+        terms = []
+        for term in set(tokenize(query)):
+            entry = self.postings.get(term)
+            if entry is None or is_common_term(len(entry[0]), count):
+                continue
+            frequency = len(entry[0])
+            idf = math.log(1 + (count - frequency + 0.5) / (frequency + 0.5))
+            terms.append((idf, entry))
+        terms.sort(key=lambda term: term[0], reverse=True)
+
+        scores: Dict[int, float] = {}
+        # Most a term can add to a score, as term counts saturate at k1 + 1
+        remaining = sum(idf for idf, _ in terms) * (BM25_K1 + 1)
+        lengths = self.lengths
+        length_norm = BM25_K1 * BM25_B / self.average_length
+        base_norm = BM25_K1 * (1 - BM25_B)
+
+        for idf, (numbers, counts) in terms:
+            threshold = (
+                heapq.nlargest(limit, scores.values())[-1]
+                if len(scores) >= limit
+                else 0.0
+            )
+            if remaining > threshold:
+                positions = range(len(numbers))
+            else:
+                positions = self._positions(numbers, scores)
+            remaining -= idf * (BM25_K1 + 1)
+
+            for position in positions:
+                number = numbers[position]
+                term_count = counts[position]
+                scores[number] = scores.get(number, 0.0) + idf * term_count * (
+                    BM25_K1 + 1
+                ) / (term_count + base_norm + length_norm * lengths[number])
+
+        return heapq.nlargest(limit, scores, key=scores.__getitem__)
+
+    @staticmethod
+    def _positions(numbers: array, scores: Dict[int, float]) -> List[int]:
+        """Find where the already scored messages are in a term's postings."""
+        if len(scores) * max(len(numbers).bit_length(), 1) >= len(numbers):
+            return [
+                position
+                for position, number in enumerate(numbers)
+                if number in scores
+            ]
+
+        positions = []
+        for number in scores:
+            position = bisect_left(numbers, number)
+            if position < len(numbers) and numbers[position] == number:
+                positions.append(position)
+        return positions
+
+    def context_ids(
+        self,
+        query: str,
+        limit: int = CONTEXT_TOP_K,
+        neighbours: int = CONTEXT_NEIGHBOURS,
+    ) -> List[int]:
+        """Get the ids of the messages relevant to query, in chronological order.
+
+        Each of the limit best matches comes with the neighbours messages
+        sent right before and after it, so it is read in its conversation.
+        """
+        count = len(self.message_ids)
+        picked = {
+            around
+            for number in self.search(query, limit)
+            for around in range(number - neighbours, number + neighbours + 1)
+            if 0 <= around < count
+        }
+        return [self.message_ids[number] for number in sorted(picked)]
+
+
+def build_session_index(session_id: int) -> SessionIndex:
+    """Index the messages of a chat session.
+
+    Opens its own database session and reads the contents through a
+    server-side cursor, so it can run on a worker thread.
+    """
+    query = (
+        select(ParsedMessage.id, ParsedMessage.content)
+        .where(ParsedMessage.session_id == session_id)
+        .order_by(ParsedMessage.timestamp, ParsedMessage.id)
+        .execution_options(yield_per=INDEX_BATCH_SIZE)
+    )
+    with Session(engine) as session:
+        return SessionIndex(session.exec(query))
+
+
+class ContextIndexCache:
+    """Indexes of the most recently used chat sessions, kept in memory.
+
+    An index is only used while its session has the message count it was
+    built with, so it is rebuilt after an append, even one another process
+    made. Concurrent requests for an index that isn't built yet wait for a
+    single build.
+    """
+
+    def __init__(self, maxsize: int = CONTEXT_INDEX_CACHE_SIZE):
+        self.maxsize = maxsize
+        self._entries: "OrderedDict[int, Tuple[int, SessionIndex]]" = OrderedDict()
+        self._locks: "weakref.WeakValueDictionary[Tuple[int, int], asyncio.Lock]" = (
+            weakref.WeakValueDictionary()
+        )
+
+    async def get_or_build(
+        self,
+        chat_session: ChatSession,
+        build: Callable[[], Awaitable[SessionIndex]],
+    ) -> SessionIndex:
+        """Get the index of a chat session, building it if needed."""
+        key = (chat_session.id, chat_session.total_messages)
+        index = self._get(key)
+        if index is not None:
+            return index
+
+        lock = self._locks.get(key)
+        if lock is None:
+            lock = self._locks[key] = asyncio.Lock()
+
+        async with lock:
+            # Built by the request this one waited for
+            index = self._get(key)
+            if index is None:
+                index = await build()
+                self._put(key, index)
+            return index
+
+    def _get(self, key: Tuple[int, int]) -> Optional[SessionIndex]:
+        session_id, message_count = key
+        entry = self._entries.get(session_id)
+        if entry is None or entry[0] != message_count:
+            return None
+        self._entries.move_to_end(session_id)
+        return entry[1]
+
+    def _put(self, key: Tuple[int, int], index: SessionIndex) -> None:
+        session_id, message_count = key
+        # Replaces the index of the session from before an append
+        self._entries[session_id] = (message_count, index)
+        self._entries.move_to_end(session_id)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+
+def find_context_messages(
+    session: Session,
+    session_id: int,
+    index: SessionIndex,
+    query: str,
+    recent: int = CONTEXT_RECENT_MESSAGES,
+) -> List[ParsedMessage]:
+    """Get the messages of a chat session to answer query with.
+
+    These are the messages most relevant to query and their neighbours, or
+    the most recent ones when no message shares a distinctive word with it.
+    Returned in chronological order.
+    """
+    message_ids = index.context_ids(query)
+    if message_ids:
+        return session.exec(
+            select(ParsedMessage)
+            .where(ParsedMessage.id.in_(message_ids))
+            .order_by(ParsedMessage.timestamp, ParsedMessage.id)
+        ).all()
+
+    latest = session.exec(
+        select(ParsedMessage)
+        .where(ParsedMessage.session_id == session_id)
+        .order_by(ParsedMessage.timestamp.desc(), ParsedMessage.id.desc())
+        .limit(recent)
+    ).all()
+    return latest[::-1]
+
+
+context_index_cache = ContextIndexCache()
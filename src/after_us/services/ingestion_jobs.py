@@ -0,0 +1,304 @@
+import logging
+import os
+import queue
+import shutil
+import threading
+import uuid
+from concurrent.futures import Executor
+from datetime import datetime, timedelta
+from typing import BinaryIO, List, Optional, Set
+from sqlalchemy import and_, or_, update
+from sqlmodel import Session, delete, select
+from ..config import (
+    CHAT_INGEST_JOB_LEASE,
+    CHAT_INGEST_WORKERS,
+    CHAT_UPLOAD_CHUNK_SIZE,
+    CHAT_UPLOAD_SPOOL_DIR,
+    CHAT_UPLOAD_TTL,
+)
+from ..models.chat import ChatSession
+from ..models.ingestion import ChunkedUpload, IngestionJob, JobStatus
+from ..models.user import User
+from ..utils.database import engine
+from .chat_archive import MediaHandler, open_chat_export
+from .chat_ingest import IngestProgress, discard_chat_session, ingest_export
+
+logger = logging.getLogger(__name__)
+
+
+def create_spool_file(spool_dir: str = CHAT_UPLOAD_SPOOL_DIR) -> str:
+    """Create an empty file in the local spool directory."""
+    os.makedirs(spool_dir, exist_ok=True)
+    spool_path = os.path.join(spool_dir, f"{uuid.uuid4().hex}.upload")
+    open(spool_path, "wb").close()
+    return spool_path
+
+
+def spool_upload(stream: BinaryIO, spool_dir: str = CHAT_UPLOAD_SPOOL_DIR) -> str:
+    """Copy an uploaded file to the local spool directory in chunks."""
+    spool_path = create_spool_file(spool_dir)
+
+    with open(spool_path, "wb") as spool_file:
+        shutil.copyfileobj(stream, spool_file, CHAT_UPLOAD_CHUNK_SIZE)
+
+    return spool_path
+
+
+def remove_spool_file(spool_path: str) -> None:
+    """Delete a spooled upload once it is no longer needed."""
+    try:
+        os.remove(spool_path)
+    except FileNotFoundError:
+        pass
+
+
+def expire_chunked_uploads(ttl: int = CHAT_UPLOAD_TTL) -> int:
+    """Drop the unfinished chunked uploads untouched for ttl seconds.
+
+    Removes their spooled files too. Returns the number of uploads dropped.
+    """
+    cutoff = datetime.utcnow() - timedelta(seconds=ttl)
+    with Session(engine) as session:
+        spool_paths = session.execute(
+            delete(ChunkedUpload)
+            .where(ChunkedUpload.job_id.is_(None), ChunkedUpload.updated_at < cutoff)
+            .returning(ChunkedUpload.spool_path)
+        ).scalars().all()
+        session.commit()
+
+    for spool_path in spool_paths:
+        remove_spool_file(spool_path)
+    return len(spool_paths)
+
+
+def claimable_jobs(lease: int = CHAT_INGEST_JOB_LEASE):
+    """Filter the jobs no worker is running.
+
+    These are the pending jobs and the running ones whose progress was not
+    saved for lease seconds, as their worker died with them.
+    """
+    cutoff = datetime.utcnow() - timedelta(seconds=lease)
+    return or_(
+        IngestionJob.status == JobStatus.PENDING,
+        and_(
+            IngestionJob.status == JobStatus.RUNNING,
+            IngestionJob.updated_at < cutoff,
+        ),
+    )
+
+
+def run_ingestion_job(
+    job_id: int,
+    executor: Optional[Executor] = None,
+    stop_event: Optional[threading.Event] = None,
+    media_handler: Optional[MediaHandler] = None,
+    lease: int = CHAT_INGEST_JOB_LEASE,
+) -> None:
+    """Parse and store the spooled upload of an ingestion job.
+
+    The upload may be a plain text export or a zip archive, whose chat text
+    is decompressed while it is parsed and whose media entries go to
+    media_handler. Append jobs only store the messages newer than the ones
+    their chat session already holds. Progress is committed with every block
+    of messages, so a job interrupted by a restart resumes from the last
+    committed line. If stop_event is set the job is put back to pending
+    after the current block.
+
+    The job is claimed with a single conditional update, so a job queued
+    twice or by several processes runs only once. Every committed block
+    renews the claim, which other workers can take over once it is lease
+    seconds old.
+    """
+    with Session(engine) as session:
+        claimed = session.execute(
+            update(IngestionJob)
+            .where(IngestionJob.id == job_id, claimable_jobs(lease))
+            .values(status=JobStatus.RUNNING, updated_at=datetime.utcnow())
+        ).rowcount
+        session.commit()
+        if not claimed:
+            return
+
+        job = session.get(IngestionJob, job_id)
+        chat_session = session.get(ChatSession, job.session_id)
+        user = session.get(User, job.user_id)
+        if chat_session is None or user is None:
+            _fail_job(session, job, "Chat session no longer exists")
+            return
+
+        def save_progress(progress: IngestProgress) -> None:
+            job.lines_read = progress.lines_read
+            job.messages_stored = progress.messages_stored
+            job.failed_lines = progress.failed_lines
+            job.updated_at = datetime.utcnow()
+            session.add(job)
+
+        progress = IngestProgress(
+            lines_read=job.lines_read,
+            messages_stored=job.messages_stored,
+            failed_lines=job.failed_lines,
+        )
+        should_stop = stop_event.is_set if stop_event is not None else None
+
+        try:
+            with open_chat_export(job.spool_path, media_handler) as stream:
+                ingest_export(
+                    session,
+                    chat_session,
+                    stream,
+                    user.name,
+                    executor,
+                    progress=progress,
+                    on_progress=save_progress,
+                    should_stop=should_stop,
+                    skip_stored=job.append,
+                )
+        except Exception as e:
+            logger.exception("Ingestion job %s failed", job_id)
+            _fail_job(session, job, f"Error processing file: {str(e)}")
+            return
+
+        if stop_event is not None and stop_event.is_set():
+            # Interrupted by shutdown, pick it up again on the next start
+            job.status = JobStatus.PENDING
+            job.updated_at = datetime.utcnow()
+            session.add(job)
+            session.commit()
+            return
+
+        # An append that finds nothing new is fine, the session has it all
+        if not chat_session.total_messages:
+            _fail_job(session, job, "No valid messages found in the file")
+            return
+
+        job.status = JobStatus.COMPLETED
+        job.updated_at = datetime.utcnow()
+        session.add(job)
+        session.commit()
+        remove_spool_file(job.spool_path)
+
+
+def _fail_job(session: Session, job: IngestionJob, error: str) -> None:
+    """Mark a job failed and drop the partially stored chat session.
+
+    The session of an append job existed before the job and is kept. The
+    blocks it committed moved the high-water mark along with them, so
+    uploading the export again stores only what is still missing.
+    """
+    session.rollback()
+    if job.session_id is not None and not job.append:
+        discard_chat_session(session, job.session_id)
+        session.refresh(job)
+
+    job.status = JobStatus.FAILED
+    job.error = error[:1000]
+    job.updated_at = datetime.utcnow()
+    session.add(job)
+    session.commit()
+    remove_spool_file(job.spool_path)
+
+
+class IngestionWorkerPool:
+    """In-process queue of ingestion jobs served by a pool of worker threads.
+
+    Job state lives in the database, the queue only carries job ids. Parsing
+    of large uploads is handed to the parse executor when one is given, and
+    media found in zip exports to the media handler. Every lease seconds the
+    jobs left behind by a crashed process are requeued.
+    """
+
+    def __init__(
+        self,
+        workers: int = CHAT_INGEST_WORKERS,
+        parse_executor: Optional[Executor] = None,
+        media_handler: Optional[MediaHandler] = None,
+        lease: int = CHAT_INGEST_JOB_LEASE,
+    ):
+        self.workers = max(workers, 1)
+        self.parse_executor = parse_executor
+        self.media_handler = media_handler
+        self.lease = lease
+        self._queue: "queue.Queue[Optional[int]]" = queue.Queue()
+        self._queued: Set[int] = set()
+        self._queued_lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._threads: List[threading.Thread] = []
+
+    def start(self) -> None:
+        """Start the worker threads and the watch for abandoned jobs."""
+        for index in range(self.workers):
+            thread = threading.Thread(
+                target=self._work, name=f"ingestion-worker-{index}", daemon=True
+            )
+            thread.start()
+            self._threads.append(thread)
+
+        thread = threading.Thread(
+            target=self._watch, name="ingestion-watch", daemon=True
+        )
+        thread.start()
+        self._threads.append(thread)
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        """Stop the workers after the block they are currently storing."""
+        self._stop_event.set()
+        for _ in self._threads:
+            self._queue.put(None)
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads.clear()
+
+    def submit(self, job_id: int) -> None:
+        """Queue a job for processing, unless it is already waiting."""
+        with self._queued_lock:
+            if job_id in self._queued:
+                return
+            self._queued.add(job_id)
+        self._queue.put(job_id)
+
+    def recover(self) -> None:
+        """Requeue the unfinished jobs no worker is running.
+
+        These are left over from a previous run or from a process that
+        crashed. Running jobs are only requeued once their lease has run
+        out. Jobs whose spooled upload is gone can't be resumed and are
+        marked failed.
+        """
+        with Session(engine) as session:
+            jobs = session.exec(
+                select(IngestionJob)
+                .where(claimable_jobs(self.lease))
+                .order_by(IngestionJob.id)
+            ).all()
+
+            for job in jobs:
+                if os.path.exists(job.spool_path):
+                    self.submit(job.id)
+                else:
+                    _fail_job(session, job, "Uploaded file was lost before processing")
+
+    def _watch(self) -> None:
+        while not self._stop_event.wait(self.lease):
+            try:
+                self.recover()
+            except Exception:
+                logger.exception("Failed to requeue abandoned ingestion jobs")
+
+    def _work(self) -> None:
+        while True:
+            job_id = self._queue.get()
+            if job_id is None or self._stop_event.is_set():
+                return
+            with self._queued_lock:
+                self._queued.discard(job_id)
+
+            try:
+                run_ingestion_job(
+                    job_id,
+                    self.parse_executor,
+                    self._stop_event,
+                    self.media_handler,
+                    self.lease,
+                )
+            except Exception:
+                logger.exception("Ingestion worker crashed on job %s", job_id)
@@ -0,0 +1,294 @@
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+from pydantic import BaseModel
+from sqlalchemy import literal_column
+from sqlmodel import Session, func, select
+from ..models.chat import ChatSessionStats, ParsedMessage
+from ..schemas.chat import (
+    ChatInsightsResponse,
+    CombinedInsightsResponse,
+    ChatPatternsResponse,
+    MonthlyVolumeResponse,
+    ReplyLatencyResponse,
+)
+from ..utils.database import engine
+from .lexicon import THEMES
+
+# Bump when a change to the computation should invalidate cached reports
+INSIGHTS_VERSION = 2
+PATTERNS_VERSION = 1
+
+
+@dataclass
+class InsightCounts:
+    """Message totals an insights report is computed from."""
+
+    total_messages: int = 0
+    user_messages: int = 0
+    positive_messages: int = 0
+    negative_messages: int = 0
+    first_message_at: Optional[datetime] = None
+    last_message_at: Optional[datetime] = None
+
+
+class InsightPartial(BaseModel):
+    """Insight totals and themes of one or more chat sessions.
+
+    Partials of separate sessions merge into the partial of all of them, in
+    any order and grouping, so each session's partial is computed and
+    cached on its own.
+    """
+
+    counts: InsightCounts = InsightCounts()
+    key_themes: List[str] = []
+
+    def merge(self, other: "InsightPartial") -> "InsightPartial":
+        """Combine the partials of two sets of sessions."""
+        a, b = self.counts, other.counts
+        themes = set(self.key_themes) | set(other.key_themes)
+        return InsightPartial(
+            counts=InsightCounts(
+                total_messages=a.total_messages + b.total_messages,
+                user_messages=a.user_messages + b.user_messages,
+                positive_messages=a.positive_messages + b.positive_messages,
+                negative_messages=a.negative_messages + b.negative_messages,
+                first_message_at=_earliest(a.first_message_at, b.first_message_at),
+                last_message_at=_latest(a.last_message_at, b.last_message_at),
+            ),
+            key_themes=[theme for theme in THEMES.categories if theme in themes],
+        )
+
+
+def _earliest(a: Optional[datetime], b: Optional[datetime]) -> Optional[datetime]:
+    return b if a is None else a if b is None else min(a, b)
+
+
+def _latest(a: Optional[datetime], b: Optional[datetime]) -> Optional[datetime]:
+    return b if a is None else a if b is None else max(a, b)
+
+
+def session_insight_counts(session: Session, session_id: int) -> InsightCounts:
+    """Read the insight totals of a chat session in one query.
+
+    Totals and sentiment are summed over the session's daily stats, the
+    first and last message come from the (session_id, timestamp) index.
+    """
+    first_timestamp = (
+        select(func.min(ParsedMessage.timestamp))
+        .where(ParsedMessage.session_id == session_id)
+        .scalar_subquery()
+    )
+    last_timestamp = (
+        select(func.max(ParsedMessage.timestamp))
+        .where(ParsedMessage.session_id == session_id)
+        .scalar_subquery()
+    )
+    row = session.exec(
+        select(
+            func.coalesce(func.sum(ChatSessionStats.message_count), 0),
+            func.coalesce(
+                func.sum(ChatSessionStats.message_count).filter(
+                    ChatSessionStats.is_user
+                ),
+                0,
+            ),
+            func.coalesce(func.sum(ChatSessionStats.positive_count), 0),
+            func.coalesce(func.sum(ChatSessionStats.negative_count), 0),
+            first_timestamp,
+            last_timestamp,
+        ).where(ChatSessionStats.session_id == session_id)
+    ).one()
+    return InsightCounts(*row)
+
+
+def compute_session_partial(session_id: int) -> InsightPartial:
+    """Compute the insight partial of one chat session.
+
+    Opens its own database session, so partials of several chat sessions
+    can be computed on separate threads at once.
+    """
+    with Session(engine) as session:
+        return InsightPartial(
+            counts=session_insight_counts(session, session_id),
+            key_themes=find_session_themes(session, session_id),
+        )
+
+
+def find_session_themes(session: Session, session_id: int) -> List[str]:
+    """Get the themes whose keywords appear in a chat session's messages.
+
+    Combines the theme bitmasks of the session's daily stats, so no message
+    text is read.
+    """
+    mask = session.exec(
+        select(func.coalesce(func.bit_or(ChatSessionStats.themes), 0)).where(
+            ChatSessionStats.session_id == session_id
+        )
+    ).one()
+    return THEMES.unmask(mask)
+
+
+def build_chat_insights(
+    session_id: int, counts: InsightCounts, key_themes: List[str]
+) -> ChatInsightsResponse:
+    """Compute the insights report of a chat session from its totals.
+
+    Works on a handful of totals however long the chat is; counts must
+    include at least one message.
+    """
+    return ChatInsightsResponse(
+        session_id=session_id, **_insight_fields(counts, key_themes)
+    )
+
+
+def build_combined_insights(
+    session_ids: List[int], counts: InsightCounts, key_themes: List[str]
+) -> CombinedInsightsResponse:
+    """Compute one insights report over several chat sessions."""
+    return CombinedInsightsResponse(
+        session_ids=session_ids, **_insight_fields(counts, key_themes)
+    )
+
+
+def _insight_fields(counts: InsightCounts, key_themes: List[str]) -> Dict[str, Any]:
+    total_messages = counts.total_messages
+    user_message_count = counts.user_messages
+    partner_message_count = total_messages - user_message_count
+
+    # Calculate relationship duration
+    duration = counts.last_message_at - counts.first_message_at
+    relationship_duration = f"{duration.days} days"
+
+    # Analyze communication patterns
+    communication_patterns = {
+        "total_messages": str(total_messages),
+        "user_percentage": f"{(user_message_count / total_messages * 100):.1f}%",
+        "partner_percentage": f"{(partner_message_count / total_messages * 100):.1f}%",
+        "messages_per_day": f"{total_messages / max(duration.days, 1):.1f}",
+    }
+
+    # Simple sentiment analysis, messages with both or neither kind of word
+    # are neutral
+    neutral_score = (
+        total_messages - counts.positive_messages - counts.negative_messages
+    )
+    emotional_tone = {
+        "positive": counts.positive_messages / total_messages,
+        "negative": counts.negative_messages / total_messages,
+        "neutral": neutral_score / total_messages,
+    }
+
+    # Calculate relationship health score (simplified)
+    health_score = (
+        emotional_tone["positive"] * 100
+        + (1 - abs(0.5 - user_message_count / total_messages)) * 50
+    )
+    health_score = min(100, max(0, health_score))
+
+    # Generate recommendations
+    recommendations = []
+    if emotional_tone["negative"] > 0.4:
+        recommendations.append(
+            "Focus on processing negative emotions through journaling or therapy"
+        )
+    if emotional_tone["positive"] > 0.6:
+        recommendations.append(
+            "Cherish the positive memories while allowing yourself to move forward"
+        )
+    if abs(user_message_count - partner_message_count) > total_messages * 0.3:
+        recommendations.append(
+            "Reflect on communication balance in future relationships"
+        )
+
+    recommendations.append(
+        "Practice self-care and be patient with your healing process"
+    )
+
+    return {
+        "relationship_duration": relationship_duration,
+        "communication_patterns": communication_patterns,
+        "emotional_tone": emotional_tone,
+        "key_themes": key_themes,
+        "relationship_health_score": round(health_score, 1),
+        "recommendations": recommendations,
+    }
+
+
+def compute_chat_patterns(session: Session, session_id: int) -> ChatPatternsResponse:
+    """Compute reply latencies and activity over time of a chat session.
+
+    Each part is a single grouped query over the session's timestamps, so
+    no message is loaded. A reply is a message whose sender differs from
+    the one of the message before it, its latency the time in between.
+    """
+    in_session = ParsedMessage.session_id == session_id
+    chronological = (ParsedMessage.timestamp, ParsedMessage.id)
+
+    replies = (
+        select(
+            ParsedMessage.sender,
+            ParsedMessage.is_user,
+            ParsedMessage.timestamp,
+            func.lag(ParsedMessage.sender)
+            .over(order_by=chronological)
+            .label("previous_sender"),
+            func.lag(ParsedMessage.timestamp)
+            .over(order_by=chronological)
+            .label("previous_timestamp"),
+        )
+        .where(in_session)
+        .subquery()
+    )
+    latency = func.extract("epoch", replies.c.timestamp - replies.c.previous_timestamp)
+    latency_rows = session.exec(
+        select(
+            replies.c.sender,
+            replies.c.is_user,
+            func.count(),
+            func.percentile_cont(0.5).within_group(latency),
+            func.percentile_cont(0.9).within_group(latency),
+        )
+        .where(
+            replies.c.previous_sender.is_not(None),
+            replies.c.previous_sender != replies.c.sender,
+        )
+        .group_by(replies.c.sender, replies.c.is_user)
+        .order_by(replies.c.sender)
+    ).all()
+
+    # ISO day of week, 1 is Monday
+    day_of_week = func.extract("isodow", ParsedMessage.timestamp)
+    hour = func.extract("hour", ParsedMessage.timestamp)
+    activity_heatmap = [[0] * 24 for _ in range(7)]
+    for day, day_hour, count in session.exec(
+        select(day_of_week, hour, func.count())
+        .where(in_session)
+        .group_by(day_of_week, hour)
+    ):
+        activity_heatmap[int(day) - 1][int(day_hour)] = count
+
+    # Inlined rather than bound, so SELECT and GROUP BY match exactly
+    month = func.date_trunc(literal_column("'month'"), ParsedMessage.timestamp)
+    monthly_rows = session.exec(
+        select(month, func.count()).where(in_session).group_by(month).order_by(month)
+    ).all()
+
+    return ChatPatternsResponse(
+        session_id=session_id,
+        reply_latency=[
+            ReplyLatencyResponse(
+                sender=sender,
+                is_user=is_user,
+                replies=count,
+                median_seconds=median,
+                p90_seconds=p90,
+            )
+            for sender, is_user, count, median, p90 in latency_rows
+        ],
+        activity_heatmap=activity_heatmap,
+        monthly_volume=[
+            MonthlyVolumeResponse(month=month_start.strftime("%Y-%m"), messages=count)
+            for month_start, count in monthly_rows
+        ],
+    )
@@ -0,0 +1,163 @@
+import asyncio
+import weakref
+from collections import OrderedDict
+from datetime import datetime
+from typing import Awaitable, Callable, Optional, Tuple, Type, TypeVar
+from pydantic import BaseModel
+from sqlalchemy import update
+from sqlmodel import Session, delete, select
+from ..config import INSIGHTS_CACHE_SIZE
+from ..models.chat import ChatSession
+from ..models.insights import CachedInsights
+from .bulk_insert import ON_CONFLICT_INSERTS
+
+Report = TypeVar("Report", bound=BaseModel)
+
+# Cache entry key: session id, report kind, report version, and the message
+# count and stats version of the session the report was computed for
+CacheKey = Tuple[int, str, int, int, int]
+
+
+class InsightsCache:
+    """Reports computed from chat sessions, kept until the session changes.
+
+    Reports are stored in the cachedinsights table, and the most recently
+    used ones are also kept in memory. Entries are keyed on the session's
+    message count and stats version as well, so a process never serves a
+    report from before an append or a rewrite of the stats, even one another
+    process made. Concurrent requests for a report that isn't cached yet
+    wait for a single computation.
+    """
+
+    def __init__(self, maxsize: int = INSIGHTS_CACHE_SIZE):
+        self.maxsize = maxsize
+        self._entries: "OrderedDict[CacheKey, BaseModel]" = OrderedDict()
+        self._locks: "weakref.WeakValueDictionary[CacheKey, asyncio.Lock]" = (
+            weakref.WeakValueDictionary()
+        )
+
+    async def get_or_compute(
+        self,
+        session: Session,
+        chat_session: ChatSession,
+        kind: str,
+        version: int,
+        report_type: Type[Report],
+        compute: Callable[[], Awaitable[Report]],
+    ) -> Report:
+        """Get a cached report of a chat session, computing it if needed."""
+        key = (
+            chat_session.id,
+            kind,
+            version,
+            chat_session.total_messages,
+            chat_session.stats_version,
+        )
+        report = self._get(key)
+        if report is not None:
+            return report
+
+        lock = self._locks.get(key)
+        if lock is None:
+            lock = self._locks[key] = asyncio.Lock()
+
+        async with lock:
+            # Computed by the request this one waited for
+            report = self._get(key)
+            if report is not None:
+                return report
+
+            report = _load(session, key, report_type)
+            if report is None:
+                report = await compute()
+                _store(session, key, report)
+
+            self._put(key, report)
+            return report
+
+    def _get(self, key: CacheKey) -> Optional[BaseModel]:
+        report = self._entries.get(key)
+        if report is not None:
+            self._entries.move_to_end(key)
+        return report
+
+    def _put(self, key: CacheKey, report: BaseModel) -> None:
+        self._entries[key] = report
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+
+def _load(
+    session: Session, key: CacheKey, report_type: Type[Report]
+) -> Optional[Report]:
+    session_id, kind, version, message_count, stats_version = key
+    payload = session.exec(
+        select(CachedInsights.payload).where(
+            CachedInsights.session_id == session_id,
+            CachedInsights.kind == kind,
+            CachedInsights.version == version,
+            CachedInsights.message_count == message_count,
+            CachedInsights.stats_version == stats_version,
+        )
+    ).first()
+    if payload is None:
+        return None
+    return report_type.model_validate_json(payload)
+
+
+def _store(session: Session, key: CacheKey, report: BaseModel) -> None:
+    session_id, kind, version, message_count, stats_version = key
+    values = {
+        "session_id": session_id,
+        "kind": kind,
+        "version": version,
+        "message_count": message_count,
+        "stats_version": stats_version,
+        "payload": report.model_dump_json(),
+        "created_at": datetime.utcnow(),
+    }
+    dialect_insert = ON_CONFLICT_INSERTS.get(session.get_bind().dialect.name)
+
+    if dialect_insert is None:
+        session.exec(
+            delete(CachedInsights).where(
+                CachedInsights.session_id == session_id,
+                CachedInsights.kind == kind,
+                CachedInsights.version == version,
+            )
+        )
+        session.add(CachedInsights(**values))
+    else:
+        statement = dialect_insert(CachedInsights).values(values)
+        session.exec(
+            statement.on_conflict_do_update(
+                index_elements=["session_id", "kind", "version"],
+                set_={
+                    "message_count": statement.excluded.message_count,
+                    "stats_version": statement.excluded.stats_version,
+                    "payload": statement.excluded.payload,
+                    "created_at": statement.excluded.created_at,
+                },
+            )
+        )
+    session.commit()
+
+
+def invalidate_insights(session: Session, session_id: int) -> None:
+    """Drop the stored reports of a chat session whose messages changed.
+
+    Also bumps the session's stats version, so no process serves the reports
+    it keeps in memory either. The caller owns the transaction. Reports of
+    deleted sessions go with them through ON DELETE CASCADE.
+    """
+    session.exec(delete(CachedInsights).where(CachedInsights.session_id == session_id))
+    session.exec(
+        update(ChatSession)
+        .where(ChatSession.id == session_id)
+        .values(stats_version=ChatSession.stats_version + 1)
+    )
+
+
+# Shared by every request of this process
+insights_cache = InsightsCache()
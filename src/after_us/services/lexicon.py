@@ -0,0 +1,140 @@
+from typing import (
+    Dict,
+    Generic,
+    Hashable,
+    List,
+    Optional,
+    Sequence,
+    Set,
+    TypeVar,
+)
+
+Category = TypeVar("Category", bound=Hashable)
+
+
+class Lexicon(Generic[Category]):
+    """Categories of keywords matched as whole words.
+
+    Keywords only match whole words: "last" matches "the last time" but not
+    "blast". Each keyword is first looked for with a plain substring test,
+    which runs in C and rules out most texts, and only where it is found are
+    the characters around it checked. Categories keep the order they are
+    given in, which is the priority used by first().
+    """
+
+    def __init__(self, categories: Dict[Category, Sequence[str]]):
+        self.categories = {
+            category: tuple(word.lower() for word in words)
+            for category, words in categories.items()
+        }
+        self._word_categories: Dict[str, List[Category]] = {}
+        for category, words in self.categories.items():
+            for word in words:
+                self._word_categories.setdefault(word, []).append(category)
+
+    def match(self, text: str) -> Set[Category]:
+        """Get every category with a keyword in text."""
+        found: Set[Category] = set()
+        text = text.lower()
+        for word, categories in self._word_categories.items():
+            if word in text and _has_word(text, word):
+                found.update(categories)
+        return found
+
+    def first(self, text: str) -> Optional[Category]:
+        """Get the highest priority category with a keyword in text."""
+        text = text.lower()
+        for category, words in self.categories.items():
+            for word in words:
+                if word in text and _has_word(text, word):
+                    return category
+        return None
+
+    def mask(self, text: str) -> int:
+        """Get the categories with a keyword in text as a bitmask.
+
+        Bit i is set for the i-th category, so masks of several texts
+        combine with a bitwise or.
+        """
+        found = self.match(text)
+        return sum(
+            1 << bit
+            for bit, category in enumerate(self.categories)
+            if category in found
+        )
+
+    def unmask(self, mask: int) -> List[Category]:
+        """Get the categories of a bitmask from mask(), in priority order."""
+        return [
+            category
+            for bit, category in enumerate(self.categories)
+            if mask & (1 << bit)
+        ]
+
+
+def _is_word_char(char: str) -> bool:
+    return char.isalnum() or char == "_"
+
+
+def _has_word(text: str, word: str) -> bool:
+    """Whether word occurs in text with no word character on either side."""
+    start = text.find(word)
+    while start >= 0:
+        end = start + len(word)
+        if (not start or not _is_word_char(text[start - 1])) and (
+            end == len(text) or not _is_word_char(text[end])
+        ):
+            return True
+        start = text.find(word, start + 1)
+    return False
+
+
+# Keyword sentiment of chat messages
+SENTIMENT = Lexicon(
+    {
+        "positive": ["love", "happy", "great", "amazing", "wonderful", "perfect"],
+        "negative": ["sad", "angry", "hate", "terrible", "awful", "horrible"],
+    }
+)
+
+
+def message_sentiment(text: str) -> int:
+    """Sentiment of a chat message from its keywords.
+
+    1 with only positive keywords, -1 with only negative ones and 0 with
+    both or neither.
+    """
+    found = SENTIMENT.match(text)
+    return ("positive" in found) - ("negative" in found)
+
+
+# What a message to the AI companion is about, in the order it is answered
+RESPONSE_TOPICS = Lexicon(
+    {
+        "sadness": ["sad", "hurt", "pain"],
+        "anger": ["angry", "mad", "furious"],
+        "longing": ["miss", "lonely", "alone"],
+        "future": ["future", "move on", "forward"],
+    }
+)
+
+# Emotion detected in a message to the AI companion
+EMOTIONS = Lexicon(
+    {
+        "sad": ["sad", "hurt", "pain"],
+        "angry": ["angry", "mad", "furious"],
+        "positive": ["happy", "good", "better"],
+        "confused": ["confused", "lost", "don't know"],
+    }
+)
+
+# Themes of a relationship looked for in its chat history
+THEMES = Lexicon(
+    {
+        "love": ["love", "romantic", "relationship", "together"],
+        "conflict": ["fight", "argue", "angry", "disagree"],
+        "future": ["future", "plans", "tomorrow", "next"],
+        "family": ["family", "parents", "mom", "dad"],
+        "work": ["work", "job", "career", "office"],
+    }
+)
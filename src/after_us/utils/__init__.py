@@ -1,2 +1,3 @@
 from .auth import *
 from .database import *
+from .pagination import *
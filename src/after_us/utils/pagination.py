@@ -0,0 +1,44 @@
+import base64
+import binascii
+import json
+from datetime import datetime
+from typing import Any, List, NamedTuple, Sequence
+
+# Cursor directions, relative to the page the cursor was taken from
+NEXT = "next"
+PREV = "prev"
+
+
+class Cursor(NamedTuple):
+    direction: str
+    key: List[Any]  # Sort key of the row the page starts after or before
+
+
+def encode_cursor(direction: str, key: Sequence[Any]) -> str:
+    """Encode a keyset position as an opaque, URL-safe cursor."""
+    payload = json.dumps(
+        {"d": direction, "k": [_encode_value(value) for value in key]},
+        separators=(",", ":"),
+    )
+    return base64.urlsafe_b64encode(payload.encode()).rstrip(b"=").decode()
+
+
+def decode_cursor(cursor: str) -> Cursor:
+    """Decode a cursor made by encode_cursor, raising ValueError if invalid."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        direction, key = payload["d"], payload["k"]
+    except (binascii.Error, UnicodeDecodeError, ValueError, TypeError, KeyError):
+        raise ValueError("Invalid cursor")
+
+    if direction not in (NEXT, PREV) or not isinstance(key, list):
+        raise ValueError("Invalid cursor")
+
+    return Cursor(direction, key)
+
+
+def _encode_value(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
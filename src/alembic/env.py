@@ -11,10 +11,11 @@ import sys
 load_dotenv()
 
 # Add app to path so imports work
-sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
 
 # ✅ Import your models here so Alembic can detect them
 from after_us import models  # ensures all models are loaded into SQLModel.metadata
+from after_us.utils.database import connection_string
 
 # Alembic Config object
 config = context.config
@@ -23,6 +24,11 @@ config = context.config
 if config.config_file_name is not None:
     fileConfig(config.config_file_name)
 
+# Fill in the %(DATABASE_URL)s placeholder of alembic.ini with the app's URL
+config.set_section_option(
+    config.config_ini_section, "DATABASE_URL", connection_string.replace("%", "%%")
+)
+
 # ✅ SQLModel metadata
 target_metadata = SQLModel.metadata
 
@@ -43,3 +49,21 @@ def run_migrations_online():
 
         with context.begin_transaction():
             context.run_migrations()
+
+
+def run_migrations_offline():
+    context.configure(
+        url=config.get_main_option("sqlalchemy.url"),
+        target_metadata=target_metadata,
+        literal_binds=True,
+        dialect_opts={"paramstyle": "named"},
+    )
+
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+if context.is_offline_mode():
+    run_migrations_offline()
+else:
+    run_migrations_online()
@@ -0,0 +1,33 @@
+"""BRIN index on message timestamps
+
+Revision ID: 2c8e5a7d4b19
+Revises: 9d3b6f1e8c42
+Create Date: 2026-10-16 23:41:07.219384
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = "2c8e5a7d4b19"
+down_revision: Union[str, None] = "9d3b6f1e8c42"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index(
+        "ix_parsedmessage_timestamp_brin",
+        "parsedmessage",
+        ["timestamp"],
+        postgresql_using="brin",
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("ix_parsedmessage_timestamp_brin", table_name="parsedmessage")
@@ -0,0 +1,95 @@
+"""Ingestion jobs and per-session high-water mark
+
+Revision ID: 3f1c2a9b7d10
+Revises:
+Create Date: 2026-10-16 09:12:44.301827
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+# revision identifiers, used by Alembic.
+revision: str = "3f1c2a9b7d10"
+down_revision: Union[str, None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Marks a job table created here rather than by the app, so that downgrade()
+# knows whether to drop the table or only the column added to it
+CREATED_COMMENT = "Created by revision 3f1c2a9b7d10"
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column(
+        "chatsession", sa.Column("last_message_at", sa.DateTime(), nullable=True)
+    )
+    op.add_column(
+        "chatsession",
+        sa.Column("boundary_hashes", sqlmodel.AutoString(length=20000), nullable=True),
+    )
+
+    # The app creates missing tables on startup, so the job table may already
+    # be there without the append flag
+    inspector = sa.inspect(op.get_bind())
+    if not inspector.has_table("ingestionjob"):
+        op.create_table(
+            "ingestionjob",
+            sa.Column("id", sa.Integer(), nullable=False),
+            sa.Column("user_id", sa.Integer(), nullable=False),
+            sa.Column("session_id", sa.Integer(), nullable=True),
+            sa.Column("filename", sqlmodel.AutoString(length=255), nullable=False),
+            sa.Column("spool_path", sqlmodel.AutoString(length=1000), nullable=False),
+            sa.Column(
+                "append", sa.Boolean(), nullable=False, server_default=sa.false()
+            ),
+            sa.Column(
+                "status",
+                sa.Enum("PENDING", "RUNNING", "COMPLETED", "FAILED", name="jobstatus"),
+                nullable=False,
+            ),
+            sa.Column("lines_read", sa.Integer(), nullable=False),
+            sa.Column("messages_stored", sa.Integer(), nullable=False),
+            sa.Column("failed_lines", sa.Integer(), nullable=False),
+            sa.Column("error", sqlmodel.AutoString(length=1000), nullable=True),
+            sa.Column("created_at", sa.DateTime(), nullable=False),
+            sa.Column("updated_at", sa.DateTime(), nullable=False),
+            sa.ForeignKeyConstraint(["user_id"], ["user.id"]),
+            sa.ForeignKeyConstraint(
+                ["session_id"], ["chatsession.id"], ondelete="SET NULL"
+            ),
+            sa.PrimaryKeyConstraint("id"),
+            comment=CREATED_COMMENT,
+        )
+        op.create_index("ix_ingestionjob_user_id", "ingestionjob", ["user_id"])
+        op.create_index("ix_ingestionjob_status", "ingestionjob", ["status"])
+    elif "append" not in {
+        column["name"] for column in inspector.get_columns("ingestionjob")
+    }:
+        op.add_column(
+            "ingestionjob",
+            sa.Column(
+                "append", sa.Boolean(), nullable=False, server_default=sa.false()
+            ),
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    inspector = sa.inspect(op.get_bind())
+    if inspector.has_table("ingestionjob"):
+        if inspector.get_table_comment("ingestionjob")["text"] == CREATED_COMMENT:
+            op.drop_index("ix_ingestionjob_status", table_name="ingestionjob")
+            op.drop_index("ix_ingestionjob_user_id", table_name="ingestionjob")
+            op.drop_table("ingestionjob")
+            sa.Enum(name="jobstatus").drop(op.get_bind(), checkfirst=True)
+        elif "append" in {
+            column["name"] for column in inspector.get_columns("ingestionjob")
+        }:
+            op.drop_column("ingestionjob", "append")
+    op.drop_column("chatsession", "boundary_hashes")
+    op.drop_column("chatsession", "last_message_at")
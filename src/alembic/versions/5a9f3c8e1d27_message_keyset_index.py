@@ -0,0 +1,32 @@
+"""Composite index for keyset pagination of messages
+
+Revision ID: 5a9f3c8e1d27
+Revises: c72d5e19a4b3
+Create Date: 2026-10-16 16:21:50.842113
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = "5a9f3c8e1d27"
+down_revision: Union[str, None] = "c72d5e19a4b3"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index(
+        "ix_parsedmessage_session_timestamp_id",
+        "parsedmessage",
+        ["session_id", "timestamp", "id"],
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("ix_parsedmessage_session_timestamp_id", table_name="parsedmessage")
@@ -0,0 +1,53 @@
+"""Sentiment and themes of each message, classified at ingest
+
+Revision ID: 6e3a9d1f5b82
+Revises: b5e1f8a3c027
+Create Date: 2026-10-17 03:22:47.519384
+
+Existing messages get NULL sentiment and themes. Run
+python -m after_us.scripts.classify_messages afterwards to fill them in and
+recount the daily stats.
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = "6e3a9d1f5b82"
+down_revision: Union[str, None] = "b5e1f8a3c027"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # The app creates missing tables on startup from the current models, so
+    # chatsessionstats may already have its themes column
+    inspector = sa.inspect(op.get_bind())
+    message_columns = {
+        column["name"] for column in inspector.get_columns("parsedmessage")
+    }
+    if "sentiment" not in message_columns:
+        op.add_column(
+            "parsedmessage", sa.Column("sentiment", sa.SmallInteger(), nullable=True)
+        )
+    if "themes" not in message_columns:
+        op.add_column(
+            "parsedmessage", sa.Column("themes", sa.SmallInteger(), nullable=True)
+        )
+    if "themes" not in {
+        column["name"] for column in inspector.get_columns("chatsessionstats")
+    }:
+        op.add_column(
+            "chatsessionstats",
+            sa.Column("themes", sa.SmallInteger(), nullable=False, server_default="0"),
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column("chatsessionstats", "themes")
+    op.drop_column("parsedmessage", "themes")
+    op.drop_column("parsedmessage", "sentiment")
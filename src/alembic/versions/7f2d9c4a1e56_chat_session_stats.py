@@ -0,0 +1,86 @@
+"""Daily per-sender stats of chat sessions
+
+Revision ID: 7f2d9c4a1e56
+Revises: 2c8e5a7d4b19
+Create Date: 2026-10-17 00:18:42.903517
+
+The stats of existing sessions are counted from their messages. Sentiment
+counts start at zero until python -m after_us.scripts.classify_messages has
+classified the messages.
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+# revision identifiers, used by Alembic.
+revision: str = "7f2d9c4a1e56"
+down_revision: Union[str, None] = "2c8e5a7d4b19"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # The app creates missing tables on startup
+    if not sa.inspect(op.get_bind()).has_table("chatsessionstats"):
+        _create_stats_table()
+
+    # Count the sessions stored before the table existed. Sentiment stays at
+    # zero, the messages are not classified yet
+    columns = {
+        column["name"]
+        for column in sa.inspect(op.get_bind()).get_columns("chatsessionstats")
+    }
+    themes, no_themes = (", themes", ", 0") if "themes" in columns else ("", "")
+    op.execute(
+        f"""
+        INSERT INTO chatsessionstats (
+            session_id, day, sender, is_user, message_count, char_count,
+            positive_count, negative_count{themes}
+        )
+        SELECT
+            m.session_id, CAST(m.timestamp AS DATE), m.sender, m.is_user,
+            count(*), coalesce(sum(length(m.content)), 0), 0, 0{no_themes}
+        FROM parsedmessage AS m
+        WHERE NOT EXISTS (
+            SELECT 1 FROM chatsessionstats AS s WHERE s.session_id = m.session_id
+        )
+        GROUP BY m.session_id, CAST(m.timestamp AS DATE), m.sender, m.is_user
+        """
+    )
+
+
+def _create_stats_table() -> None:
+    op.create_table(
+        "chatsessionstats",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("session_id", sa.Integer(), nullable=False),
+        sa.Column("day", sa.Date(), nullable=False),
+        sa.Column("sender", sqlmodel.AutoString(length=100), nullable=False),
+        sa.Column("is_user", sa.Boolean(), nullable=False),
+        sa.Column("message_count", sa.Integer(), nullable=False),
+        sa.Column("char_count", sa.Integer(), nullable=False),
+        sa.Column("positive_count", sa.Integer(), nullable=False),
+        sa.Column("negative_count", sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(
+            ["session_id"], ["chatsession.id"], ondelete="CASCADE"
+        ),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index(
+        "ix_chatsessionstats_session_day_sender",
+        "chatsessionstats",
+        ["session_id", "day", "sender", "is_user"],
+        unique=True,
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(
+        "ix_chatsessionstats_session_day_sender", table_name="chatsessionstats"
+    )
+    op.drop_table("chatsessionstats")
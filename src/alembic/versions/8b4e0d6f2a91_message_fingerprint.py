@@ -0,0 +1,40 @@
+"""Message fingerprint with a unique index per session
+
+Revision ID: 8b4e0d6f2a91
+Revises: 3f1c2a9b7d10
+Create Date: 2026-10-16 11:40:05.118302
+
+Existing rows get a NULL fingerprint, which the unique index ignores. Run
+python -m after_us.scripts.dedupe_messages afterwards to fill them in and
+drop the duplicates.
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = "8b4e0d6f2a91"
+down_revision: Union[str, None] = "3f1c2a9b7d10"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column(
+        "parsedmessage", sa.Column("fingerprint", sa.BigInteger(), nullable=True)
+    )
+    op.create_index(
+        "ix_parsedmessage_session_fingerprint",
+        "parsedmessage",
+        ["session_id", "fingerprint"],
+        unique=True,
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("ix_parsedmessage_session_fingerprint", table_name="parsedmessage")
+    op.drop_column("parsedmessage", "fingerprint")
@@ -0,0 +1,45 @@
+"""Full-text search vector on message content
+
+Revision ID: 9d3b6f1e8c42
+Revises: e4a7b2c9f613
+Create Date: 2026-10-16 23:02:18.556904
+
+Adding a stored generated column rewrites parsedmessage, so expect this to
+take a while on a large table.
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision: str = "9d3b6f1e8c42"
+down_revision: Union[str, None] = "e4a7b2c9f613"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column(
+        "parsedmessage",
+        sa.Column(
+            "search_vector",
+            postgresql.TSVECTOR(),
+            sa.Computed("to_tsvector('simple', content)", persisted=True),
+        ),
+    )
+    op.create_index(
+        "ix_parsedmessage_search_vector",
+        "parsedmessage",
+        ["search_vector"],
+        postgresql_using="gin",
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("ix_parsedmessage_search_vector", table_name="parsedmessage")
+    op.drop_column("parsedmessage", "search_vector")
@@ -0,0 +1,55 @@
+"""64-bit sizes of chunked uploads
+
+Revision ID: a83f4c6e2d15
+Revises: 6e3a9d1f5b82
+Create Date: 2026-10-17 09:12:05.360418
+
+Exports over 2 GiB overflowed the integer size and offset columns.
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = "a83f4c6e2d15"
+down_revision: Union[str, None] = "6e3a9d1f5b82"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.alter_column(
+        "chunkedupload",
+        "size",
+        type_=sa.BigInteger(),
+        existing_type=sa.Integer(),
+        existing_nullable=True,
+    )
+    op.alter_column(
+        "chunkedupload",
+        "received",
+        type_=sa.BigInteger(),
+        existing_type=sa.Integer(),
+        existing_nullable=False,
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.alter_column(
+        "chunkedupload",
+        "received",
+        type_=sa.Integer(),
+        existing_type=sa.BigInteger(),
+        existing_nullable=False,
+    )
+    op.alter_column(
+        "chunkedupload",
+        "size",
+        type_=sa.Integer(),
+        existing_type=sa.BigInteger(),
+        existing_nullable=True,
+    )
@@ -0,0 +1,55 @@
+"""Cached insight reports of chat sessions
+
+Revision ID: b5e1f8a3c027
+Revises: 7f2d9c4a1e56
+Create Date: 2026-10-17 01:05:12.774630
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+# revision identifiers, used by Alembic.
+revision: str = "b5e1f8a3c027"
+down_revision: Union[str, None] = "7f2d9c4a1e56"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # The app creates missing tables on startup
+    if sa.inspect(op.get_bind()).has_table("cachedinsights"):
+        return
+
+    op.create_table(
+        "cachedinsights",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("session_id", sa.Integer(), nullable=False),
+        sa.Column("kind", sqlmodel.AutoString(length=50), nullable=False),
+        sa.Column("version", sa.Integer(), nullable=False),
+        sa.Column("message_count", sa.Integer(), nullable=False),
+        sa.Column("payload", sa.Text(), nullable=False),
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(
+            ["session_id"], ["chatsession.id"], ondelete="CASCADE"
+        ),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index(
+        "ix_cachedinsights_session_kind_version",
+        "cachedinsights",
+        ["session_id", "kind", "version"],
+        unique=True,
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(
+        "ix_cachedinsights_session_kind_version", table_name="cachedinsights"
+    )
+    op.drop_table("cachedinsights")
@@ -0,0 +1,53 @@
+"""Resumable chunked uploads
+
+Revision ID: c72d5e19a4b3
+Revises: 8b4e0d6f2a91
+Create Date: 2026-10-16 14:03:27.655190
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+# revision identifiers, used by Alembic.
+revision: str = "c72d5e19a4b3"
+down_revision: Union[str, None] = "8b4e0d6f2a91"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # The app creates missing tables on startup
+    if sa.inspect(op.get_bind()).has_table("chunkedupload"):
+        return
+
+    op.create_table(
+        "chunkedupload",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("user_id", sa.Integer(), nullable=False),
+        sa.Column("session_id", sa.Integer(), nullable=True),
+        sa.Column("filename", sqlmodel.AutoString(length=255), nullable=False),
+        sa.Column("spool_path", sqlmodel.AutoString(length=1000), nullable=False),
+        sa.Column("size", sa.Integer(), nullable=True),
+        sa.Column("received", sa.Integer(), nullable=False),
+        sa.Column("job_id", sa.Integer(), nullable=True),
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+        sa.Column("updated_at", sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(["user_id"], ["user.id"]),
+        sa.ForeignKeyConstraint(
+            ["session_id"], ["chatsession.id"], ondelete="SET NULL"
+        ),
+        sa.ForeignKeyConstraint(["job_id"], ["ingestionjob.id"], ondelete="SET NULL"),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index("ix_chunkedupload_user_id", "chunkedupload", ["user_id"])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("ix_chunkedupload_user_id", table_name="chunkedupload")
+    op.drop_table("chunkedupload")
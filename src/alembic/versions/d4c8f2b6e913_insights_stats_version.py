@@ -0,0 +1,41 @@
+"""Stats version of chat sessions and cached insights
+
+Revision ID: d4c8f2b6e913
+Revises: a83f4c6e2d15
+Create Date: 2026-10-17 10:41:36.208175
+
+Cached reports are keyed on it, so rewriting the stats of a session without
+changing its message count no longer leaves stale reports in memory.
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = "d4c8f2b6e913"
+down_revision: Union[str, None] = "a83f4c6e2d15"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    inspector = sa.inspect(op.get_bind())
+    # The app creates missing tables on startup, with the column already there
+    for table in ("chatsession", "cachedinsights"):
+        columns = {column["name"] for column in inspector.get_columns(table)}
+        if "stats_version" not in columns:
+            op.add_column(
+                table,
+                sa.Column(
+                    "stats_version", sa.Integer(), nullable=False, server_default="0"
+                ),
+            )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column("cachedinsights", "stats_version")
+    op.drop_column("chatsession", "stats_version")
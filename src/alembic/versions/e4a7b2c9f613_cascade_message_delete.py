@@ -0,0 +1,54 @@
+"""Cascade message deletes from chat sessions
+
+Revision ID: e4a7b2c9f613
+Revises: 5a9f3c8e1d27
+Create Date: 2026-10-16 22:10:31.407265
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = "e4a7b2c9f613"
+down_revision: Union[str, None] = "5a9f3c8e1d27"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.drop_constraint(
+        "parsedmessage_session_id_fkey", "parsedmessage", type_="foreignkey"
+    )
+    op.create_foreign_key(
+        "parsedmessage_session_id_fkey",
+        "parsedmessage",
+        "chatsession",
+        ["session_id"],
+        ["id"],
+        ondelete="CASCADE",
+    )
+    op.add_column(
+        "chatsession",
+        sa.Column(
+            "deleting", sa.Boolean(), nullable=False, server_default=sa.false()
+        ),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column("chatsession", "deleting")
+    op.drop_constraint(
+        "parsedmessage_session_id_fkey", "parsedmessage", type_="foreignkey"
+    )
+    op.create_foreign_key(
+        "parsedmessage_session_id_fkey",
+        "parsedmessage",
+        "chatsession",
+        ["session_id"],
+        ["id"],
+    )
@@ -0,0 +1,137 @@
+"""Storing parsed chat messages, see after_us.services.chat_ingest."""
+
+import json
+import os
+from datetime import datetime
+
+import pytest
+
+from after_us.models.chat import ChatSession
+from after_us.services import chat_ingest
+from after_us.services.bulk_insert import set_fingerprints
+from after_us.services.chat_parser import ParsedBlock
+
+
+class FakeDatabase:
+    """Keeps inserted rows unique on (session_id, fingerprint), like the index."""
+
+    def __init__(self):
+        self.rows = {}
+
+    def bulk_insert_messages(self, session, rows):
+        set_fingerprints(rows)
+        stored = 0
+        for row in rows:
+            key = (row["session_id"], row["fingerprint"])
+            if key not in self.rows:
+                self.rows[key] = row
+                stored += 1
+        return stored
+
+
+class FakeSession:
+    def add(self, instance):
+        pass
+
+    def commit(self):
+        pass
+
+
+@pytest.fixture
+def database(monkeypatch):
+    database = FakeDatabase()
+    monkeypatch.setattr(
+        chat_ingest, "bulk_insert_messages", database.bulk_insert_messages
+    )
+    monkeypatch.setattr(chat_ingest, "refresh_session_stats", lambda *args: None)
+    monkeypatch.setattr(chat_ingest, "invalidate_insights", lambda *args: None)
+    return database
+
+
+def message(minute: int, sender: str, content: str) -> tuple:
+    return datetime(2021, 12, 31, 21, minute), sender, content, sender == "Alice"
+
+
+def chat_session() -> ChatSession:
+    return ChatSession(id=1, user_id=1, filename="chat.txt", participants="[]")
+
+
+def test_repeats_in_the_same_minute_are_all_stored(database):
+    messages = [
+        message(41, "Bob", "ok"),
+        message(41, "Bob", "ok"),
+        message(41, "Alice", "ok"),
+    ]
+
+    progress = chat_ingest.ingest_blocks(
+        FakeSession(), chat_session(), [ParsedBlock(3, messages, 0)]
+    )
+
+    assert progress.messages_stored == 3
+    assert len(database.rows) == 3
+
+
+def test_repeats_split_across_blocks_are_all_stored(database):
+    blocks = [
+        ParsedBlock(1, [message(41, "Bob", "ok")], 0),
+        ParsedBlock(1, [message(41, "Bob", "ok")], 0),
+    ]
+
+    progress = chat_ingest.ingest_blocks(FakeSession(), chat_session(), blocks)
+
+    assert progress.messages_stored == 2
+
+
+def test_append_stores_only_the_new_repeat(database):
+    target = chat_session()
+    first = [message(40, "Alice", "hi"), message(41, "Bob", "ok")]
+    chat_ingest.ingest_blocks(FakeSession(), target, [ParsedBlock(2, first, 0)])
+
+    export = first + [message(41, "Bob", "ok")]
+    progress = chat_ingest.ingest_blocks(
+        FakeSession(), target, [ParsedBlock(3, export, 0)], skip_stored=True
+    )
+
+    assert progress.messages_stored == 1
+    assert len(database.rows) == 3
+
+
+@pytest.mark.skipif(
+    not os.environ.get("TEST_DATABASE_URL"),
+    reason="needs a Postgres database in TEST_DATABASE_URL",
+)
+def test_repeats_are_stored_in_postgres():
+    from sqlmodel import Session, SQLModel, create_engine, func, select
+
+    from after_us.models import ParsedMessage, User
+
+    engine = create_engine(os.environ["TEST_DATABASE_URL"])
+    SQLModel.metadata.create_all(engine)
+
+    with Session(engine) as session:
+        user = User(
+            email=f"test-{datetime.utcnow().timestamp()}@example.com",
+            name="Alice",
+            hashed_password="-",
+        )
+        session.add(user)
+        session.commit()
+        target = ChatSession(
+            user_id=user.id, filename="chat.txt", participants=json.dumps([])
+        )
+        session.add(target)
+        session.commit()
+
+        messages = [message(41, "Bob", "ok"), message(41, "Bob", "ok")]
+        chat_ingest.ingest_blocks(session, target, [ParsedBlock(2, messages, 0)])
+
+        stored = session.exec(
+            select(func.count(ParsedMessage.id)).where(
+                ParsedMessage.session_id == target.id
+            )
+        ).one()
+        session.delete(target)
+        session.delete(user)
+        session.commit()
+
+    assert stored == 2
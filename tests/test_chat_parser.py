@@ -0,0 +1,49 @@
+"""Parsing WhatsApp exports, see after_us.services.chat_parser."""
+
+from datetime import datetime, timedelta
+
+from after_us.chat_format import FORMAT_SAMPLE_LINES
+from after_us.services.chat_parser import (
+    iter_parsed_blocks,
+    parse_whatsapp_export,
+    split_text_blocks,
+)
+
+
+def month_first_export(ambiguous_lines: int) -> str:
+    """An mm/dd export whose opening lines all fall on a day up to the 12th."""
+    start = datetime(2021, 1, 1, 9, 0)
+    lines = [
+        f"{start + timedelta(minutes=i):%m/%d/%Y, %H:%M} - Alice: hi {i}"
+        for i in range(ambiguous_lines)
+    ]
+    lines.append("01/13/2021, 09:00 - Bob: the 13th settles it")
+    return "\n".join(lines)
+
+
+def test_month_first_is_detected_past_the_sample():
+    content = month_first_export(FORMAT_SAMPLE_LINES + 100)
+
+    messages = parse_whatsapp_export(content, "Alice")
+
+    assert messages[0][0] == datetime(2021, 1, 1, 9, 0)
+    assert messages[-1] == (
+        datetime(2021, 1, 13, 9, 0),
+        "Bob",
+        "the 13th settles it",
+        False,
+    )
+
+
+def test_month_first_is_detected_in_a_later_block():
+    content = month_first_export(FORMAT_SAMPLE_LINES + 100)
+    blocks = split_text_blocks(content, 1000)
+
+    parsed = list(iter_parsed_blocks(blocks, "Alice"))
+
+    assert len(parsed) > 2
+    assert sum(block.lines for block in parsed) == FORMAT_SAMPLE_LINES + 101
+    messages = [message for block in parsed for message in block.messages]
+    assert len(messages) == FORMAT_SAMPLE_LINES + 101
+    assert messages[0][0] == datetime(2021, 1, 1, 9, 0)
+    assert messages[-1][0] == datetime(2021, 1, 13, 9, 0)
@@ -0,0 +1,15 @@
+"""Keyword matching, see after_us.services.lexicon."""
+
+from after_us.services.lexicon import EMOTIONS, THEMES, message_sentiment
+
+
+def test_keywords_match_whole_words_only():
+    assert THEMES.match("Last night was a blast at the office!") == {"work"}
+    assert THEMES.match("officers, networking and a lovely dadaist") == set()
+    assert message_sentiment("LOVE_it, so lovely") == 0
+
+
+def test_first_follows_category_priority():
+    assert EMOTIONS.first("I'm happy but so sad") == "sad"
+    assert EMOTIONS.first("I just don't know anymore") == "confused"
+    assert EMOTIONS.first("madness") is None